@@ -1,6 +1,9 @@
 from TMGE import *
-import copy
+from TMGE_render import TerminalRenderer
+from TMGE_metrics import Metrics, phase
+import random
 from time import sleep
+from typing import Generator
 
 RED = "\033[31m"
 GREEN = "\033[32m"
@@ -15,21 +18,90 @@ class Jewel:
     def __init__(self, letter: str, color_code: str):
         self.body = letter
         self.color_code = color_code
-        self.matching = False
-    def __repr__(self):
+    def display(self, matching: bool) -> str:
         border: str
-        if self.matching:
+        if matching:
             border = '!'
         else:
             border = ' '
         return self.color_code + border + self.body + border + RESET
+    def __repr__(self):
+        return self.display(False)
+
+# Shared by every board; per-cell state such as the matching highlight is kept on the Board
+JEWELS = [Jewel('R', RED), Jewel('G', GREEN), Jewel('B', BLUE), Jewel('Y', YELLOW), Jewel('O', ORANGE), Jewel('P', PURPLE), Jewel('W', WHITE)]
     
 class BejeweledGameOver(Exception):
     pass
+
+# Whether any legal swap exists, by board state key
+_FUTURE_MATCHES_CACHE = LRUCache(65536)
+
+# Board generation rules, shared by the game and by simulations on board copies
+
+def refillSolvable(board: Board, rng: random.Random) -> str:
+    # Bounded: one constrained fill, then at most one planted move, then a fresh board.
+    # Returns which of "fill", "planted" or "rebuilt" produced the final board.
+    filled = board.fillMissingTilesWithoutMatches()
+    if (board.hasValidSwap()):
+        return "fill"
+    if (plantMove(board, filled, rng)):
+        return "planted"
+    makeSolvableBoard(board, rng)
+    return "rebuilt"
+
+# refillSolvable outcome -> generation attempts it took, for instrumentation
+REFILL_ATTEMPTS = {"fill": 1, "planted": 2, "rebuilt": 3}
+
+def plantMove(board: Board, positions: list[tuple], rng: random.Random) -> bool:
+    # Recolour one of the given cells, without creating a match, so that swapping it with a neighbour makes one
+    positions = list(positions)
+    rng.shuffle(positions)
+    for x, y in positions:
+        original = board.getContentAt(x, y)
+        for i, j in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            if not board.isWithinBounds(x + i, y + j):
+                continue
+            for content in board.getContentsWithoutMatch(x, y):
+                board.setTileAt(x, y, content)
+                if (board.matchesCreatedBySwap((x, y), (x + i, y + j))):
+                    return True
+        board.setTileAt(x, y, original)
+    return False
+
+def scoreRuns(runs: list[list[tuple]], player: int, depth: int, multiplier: int = 1) -> list[ScoreEvent]:
+    # One event per run; a cell shared by crossing runs is credited to the first run only
+    credited = set()
+    events = []
+    for run in runs:
+        fresh = [position for position in run if position not in credited]
+        credited.update(fresh)
+        events.append(ScoreEvent(player, len(run), len(fresh), depth, multiplier))
+    return events
+
+def makeSolvableBoard(board: Board, rng: random.Random) -> None:
+    # Plant a ready-made move (A A . / . . A) and fill the rest around it without matches
+    board.clearBoard()
+    if board.height >= 2 and board.width >= 3:
+        x = rng.randrange(board.height - 1)
+        y = rng.randrange(board.width - 2)
+        jewel = rng.choice(board.colors)
+        for position in [(x, y), (x, y + 1), (x + 1, y + 2)]:
+            board.setTileAt(position[0], position[1], jewel)
+    board.fillMissingTilesWithoutMatches()
     
 class Bejeweled(ShellGame):
-    def __init__(self, players: list[PlayerProfile]):
-        self._board: Board = Board(8, 8, [Jewel('R', RED), Jewel('G', GREEN), Jewel('B', BLUE), Jewel('Y', YELLOW), Jewel('O', ORANGE), Jewel('P', PURPLE), Jewel('W', WHITE)])
+    def __init__(self, players: list[PlayerProfile], headless: bool = False, rng: Optional[random.Random] = None,
+                 recordScores: bool = False, metrics: Optional[Metrics] = None):
+        self.metrics = metrics # Phase timings and counters under "bejeweled.", off when None
+        self._headless = headless
+        self._recordScores = recordScores # Add a "score" event per matched run to step results
+        self._rng = rng if rng is not None else random
+        self._finished = False
+        self._finishReason: Optional[str] = None
+        self._events: list[dict] = []
+        self._renderer = None if headless else TerminalRenderer()
+        self._board: Board = Board(8, 8, JEWELS, self._rng)
         self._makeInitialBoard()
         self._turnsToPlay: int = len(players) * 5
         self._player_turn = 0
@@ -47,78 +119,181 @@ class Bejeweled(ShellGame):
         print("(press enter when finished viewing)")
         input()
         return self._scores
-    
+
+    def getLegalMoves(self) -> list[tuple[tuple, tuple]]:
+        return self._board.getValidSwaps()
+
+    def isFinished(self) -> bool:
+        return self._finished
+
+    def getState(self) -> list[list[int]]:
+        return self._board.getCodeGrid()
+
+    def evaluateMove(self, move: tuple[tuple, tuple]) -> float:
+        return len(self._board.matchesCreatedBySwap(*move))
+
+    @classmethod
+    def createHeadless(cls, players: int = 1, rng: Optional[random.Random] = None, metrics: Optional[Metrics] = None) -> 'Bejeweled':
+        return cls([PlayerProfile(player_id, [], 0, 0) for player_id in range(players)], headless=True, rng=rng, metrics=metrics)
+
+    def step(self, move: tuple[tuple, tuple]) -> StepResult:
+        # One full turn from a ((row, col), (row, col)) swap, 0-based; a swap that matches nothing ends the game
+        with phase(self.metrics, "bejeweled.phase.turn"):
+            stages = self.stepStages(move)
+            while True:
+                try:
+                    next(stages)
+                except StopIteration as done:
+                    return done.value
+
+    def stepStages(self, move: tuple[tuple, tuple]) -> Generator[None, None, StepResult]:
+        # step() as a generator that pauses after each cascade stage, so a caller can show the board
+        # between stages; the StepResult is the generator's return value
+        p1, p2 = move
+        if (self._finished or not self._board.isWithinBounds(*p1) or not self._board.isWithinBounds(*p2)
+                or abs(p1[0] - p2[0]) + abs(p1[1] - p2[1]) != 1):
+            return self._stepResult(move, False)
+        self._events = [{"type": "swap", "player": self._players[self._player_turn].player_id, "from": p1, "to": p2}]
+        try:
+            self._handleMovePhase(self._board.getTileAt(*p1), self._board.getTileAt(*p2))
+            yield from self._cascadeStages()
+            self._endTurn()
+        except BejeweledGameOver:
+            pass
+        return self._stepResult(move, True)
+
+    def _stepResult(self, move: Any, valid: bool) -> StepResult:
+        return StepResult(move, valid, dict(self._scores), self._events if valid else [],
+                          self.getState(), self._finished, self._finishReason)
+
     def _runGame(self):
         self._showBoardAndScore()
-        while (self._currentTurnNumber <= self._turnsToPlay):
-            jewel1, jewel2 = self._collectMovePhase() # Collect moves until valid
+        while (not self._finished):
+            with phase(self.metrics, "bejeweled.phase.input"):
+                jewel1, jewel2 = self._collectMovePhase() # Collect moves until valid
 
             self._handleMovePhase(jewel1, jewel2) # Handle the move provided
 
-            self._cascadePhase() # Cascading phase / Match Failure, game over
+            with phase(self.metrics, "bejeweled.phase.cascade"): # Includes the animation pauses
+                self._cascadePhase() # Cascading phase / Match Failure, game over
 
-            self._currentTurnNumber += 1 # End of Turn
-            self._player_turn = (self._currentTurnNumber - 1) % len(self._players)
+            self._endTurn() # End of Turn
             self._showBoardAndScore()
         self._concludeGame() # Game Complete Phase
         return
+
+    def _endTurn(self):
+        self._currentTurnNumber += 1
+        self._player_turn = (self._currentTurnNumber - 1) % len(self._players)
+        if self._currentTurnNumber > self._turnsToPlay:
+            self._finished = True
+            self._finishReason = "turns"
     
     def _concludeGame(self):
+        if self._headless:
+            return
         print("\nGAME OVER!\n\nTotal Score:")
         for player in self._players:
             print("Player " + str(player.player_id) + ": " + str(self._scores[player.player_id]))
     
     def _gameOver(self):
-        print("\nYour move failed to cause a match. Player " + str(self._players[self._player_turn].player_id) + " loses.\n\nGAME OVER!")
+        self._finished = True
+        self._finishReason = "no-match"
+        self._events.append({"type": "gameOver", "reason": self._finishReason})
+        if not self._headless:
+            print("\nYour move failed to cause a match. Player " + str(self._players[self._player_turn].player_id) + " loses.\n\nGAME OVER!")
         raise BejeweledGameOver()
     
     def _showBoardAndScore(self):
-        print("\n" * 20)
-        print(self._board.getBoardDisplay())
-        print("\nPlayer " + str(self._players[self._player_turn].player_id) + ", Turn " + str(self._currentTurnNumber) + "/" + str(self._turnsToPlay))
-        print("Score " + str(self._scores[self._players[self._player_turn].player_id]))
+        if self._headless:
+            return
+        self._renderer.render(self._board.getDisplayGlyphs(), self.getStatusLines())
+
+    def getStatusLines(self) -> list[str]:
+        player_id = self._players[self._player_turn].player_id
+        return ["", "Player " + str(player_id) + ", Turn " + str(self._currentTurnNumber) + "/" + str(self._turnsToPlay),
+                "Score " + str(self._scores[player_id])]
+
+    def comboMultiplier(self, depth: int) -> int:
+        # Points multiplier for runs cleared at the given cascade depth (1 = the swap itself)
+        return 1
+
+    def _pause(self, seconds: float):
+        if not self._headless:
+            sleep(seconds)
     
     def _cascadePhase(self):
-        matchSet = self._board.getMatchingSets()
-        if (len(matchSet) == 0):
-            self._gameOver()
-        while (len(matchSet) != 0):
-            self._showBoardAndScore() # Board after move or refill
-            sleep(1)
-
-            self._markMatchers(matchSet) # Board During Matches
-            if len(self._players) == 2:
-                self._scores[self._player_turn] += len(matchSet)
-            else:
-                self._scores[self._players[0].player_id] += len(matchSet)
+        for _ in self._cascadeStages():
             self._showBoardAndScore()
-            sleep(1)
+            self._pause(1)
 
-            self._board.clearTileSet(matchSet) # Board after matches
-            self._showBoardAndScore()
-            sleep(1)
+    def _cascadeStages(self) -> Generator[None, None, None]:
+        # Yields after each stage whose board should be shown: after the move or refill, during matches,
+        # after clearing and after gravity. Phase timers stop before each yield, so pauses are not counted.
+        metrics = self.metrics
+        with phase(metrics, "bejeweled.phase.match"):
+            runs = self._board.getMatchingRuns()
+        if (len(runs) == 0):
+            self._gameOver()
+        player = self._players[self._player_turn].player_id
+        depth = 0
+        while (len(runs) != 0):
+            depth += 1
+            with phase(metrics, "bejeweled.phase.score"):
+                scored = scoreRuns(runs, player, depth, self.comboMultiplier(depth))
+            self._events.append({"type": "match", "depth": depth, "cleared": sum(event.cells for event in scored)})
+            if metrics is not None:
+                for run in runs:
+                    metrics.observe("bejeweled.match_size", len(run))
+            yield # Board after move or refill
 
-            self._board.applyGravity() # Board after gravity
-            self._showBoardAndScore()
-            sleep(1)
+            matched = [position for run in runs for position in run]
+            self._board.markPositions(matched) # Board During Matches
+            self._addScores(scored)
+            yield
 
-            self._refillBoard() # Perform refill        
-            matchSet = self._board.getMatchingSets()
+            with phase(metrics, "bejeweled.phase.clear"):
+                self._board.clearPositions(matched) # Board after matches
+            yield
 
-    def _markMatchers(self, matchers: Set[Tile]):
-        for tile in matchers:
-            tile.contents.content = copy.deepcopy(tile.contents.content)
-            tile.contents.content.matching = True
+            with phase(metrics, "bejeweled.phase.gravity"):
+                self._board.applyGravity() # Board after gravity
+            yield
+
+            with phase(metrics, "bejeweled.phase.refill"):
+                self._refillBoard() # Perform refill        
+            with phase(metrics, "bejeweled.phase.match"):
+                runs = self._board.getMatchingRuns()
+        if metrics is not None:
+            metrics.observe("bejeweled.cascade_depth", depth)
+
+    def _addScores(self, scored: list[ScoreEvent]):
+        for event in scored:
+            self._scores[event.player] += event.points
+            if self._recordScores:
+                self._events.append(event.asEvent())
 
     def _handleMovePhase(self, jewel1: Tile, jewel2: Tile):
-        self._board.swapPositions(jewel1, jewel2)
+        with phase(self.metrics, "bejeweled.phase.move"):
+            self._board.swapPositions(jewel1, jewel2)
         self._showBoardAndScore()
     
+    def _showHint(self):
+        move = self._findValidMove(self._board)
+        if move is None:
+            print("No moves available.")
+            return
+        (x1, y1), (x2, y2) = move
+        print("Hint: swap (" + str(x1 + 1) + " " + str(y1 + 1) + ") with (" + str(x2 + 1) + " " + str(y2 + 1) + ")")
+
     def _collectMovePhase(self) -> tuple[Tile, Tile]:
         while (True):
             try:
                 # Get first tile to swap
-                first_tile_input = input("First jewel (row col): ").strip()
+                first_tile_input = input("First jewel (row col), or H for a hint: ").strip()
+                if first_tile_input.lower() == "h":
+                    self._showHint()
+                    continue
 
                 first_row, first_col = map(int, first_tile_input.split())
                 first_row -= 1
@@ -143,58 +318,32 @@ class Bejeweled(ShellGame):
                 print(f"An error occurred: {e}")
     
     def _refillBoard(self):
-        replacementBoard: Board
-        attempts = 0
-        while (True):
-            attempts += 1
-            replacementBoard = copy.deepcopy(self._board)
-            replacementBoard.fillMissingTiles()
-            if (self._futureMatchesExist(replacementBoard)): 
-                break
-            if attempts > 100:
-                self._makeInitialBoard()
-                return
-        self._board = replacementBoard
+        outcome = refillSolvable(self._board, self._rng)
+        if self.metrics is not None:
+            self.metrics.observe("bejeweled.refill_attempts", REFILL_ATTEMPTS[outcome])
+            if outcome == "rebuilt":
+                self.metrics.count("bejeweled.regenerations")
 
     def _makeInitialBoard(self):
-        while (True):
-            while (True):
-                self._board.fillMissingTiles()
-                matchset = self._board.getMatchingSets()
-                if (len(matchset) == 0):
-                    break
-                else:
-                    self._board.clearTileSet(matchset)
-            if (self._futureMatchesExist(self._board)):
-                break
-            else:
-                self._board = Board(8, 8, [Jewel('R', RED), Jewel('G', GREEN), Jewel('B', BLUE), Jewel('Y', YELLOW), Jewel('O', ORANGE), Jewel('P', PURPLE), Jewel('W', WHITE)])
+        with phase(self.metrics, "bejeweled.phase.initial_board"):
+            makeSolvableBoard(self._board, self._rng)
+        if self.metrics is not None:
+            self.metrics.count("bejeweled.initial_boards")
             
     def _matchesExist(self, board: Board):
-        return len(board.getMatchingSets()) > 0
+        return board.hasMatches()
+
+    def _findValidMove(self, board: Board) -> Optional[tuple[tuple, tuple]]:
+        swaps = board.getValidSwaps()
+        return swaps[0] if swaps else None
 
     def _futureMatchesExist(self, board: Board) -> bool:
-        def hasMatchingMove(x: int, y: int, board: Board):
-            for i, j in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                xb = x + i
-                yb = y + j
-                if not board.isWithinBounds(xb, yb):
-                    continue
-                tile1 = board.getTileAt(x, y)
-                tile2 = board.getTileAt(xb, yb)
-                board.swapPositions(tile1, tile2)
-                if (self._matchesExist(board)):
-                    return True
-                else:
-                    board.swapPositions(tile1, tile2)
-            return False
-
-        scenarioBoard = copy.deepcopy(board)
-        for x in range(0, self._board.width):
-            for y in range(0, self._board.height):
-                if hasMatchingMove(x, y, scenarioBoard):
-                    return True
-        return False
+        key = board.getStateKey()
+        exists = _FUTURE_MATCHES_CACHE.get(key)
+        if exists is None:
+            exists = board.hasValidSwap()
+            _FUTURE_MATCHES_CACHE.put(key, exists)
+        return exists
 
 if __name__ == '__main__':
     game = Bejeweled([PlayerProfile(0, [], 0, 0), PlayerProfile(1, [], 0, 0)])
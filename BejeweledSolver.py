@@ -0,0 +1,132 @@
+from TMGE import *
+import Bejeweled
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Hint and bot engine for Bejeweled: every legal swap is played out on a Board.copy()
+# through the full clear / gravity / refill cascade and ranked by expected score.
+
+class CascadeOutcome:
+    def __init__(self, score: int, depth: int, board: Board):
+        self.score = score
+        self.depth = depth
+        self.board = board
+
+    def followUpScore(self) -> int:
+        # Cells matched by the best immediate swap on the board left behind
+        return max((len(self.board.matchesCreatedBySwap(*swap)) for swap in self.board.getValidSwaps()), default=0)
+
+
+class RankedMove:
+    def __init__(self, swap: tuple[tuple, tuple], scores: list[int], depths: list[int]):
+        self.swap = swap
+        self.scores = scores
+        self.depths = depths
+        self.expectedScore = sum(scores) / len(scores)
+        self.expectedDepth = sum(depths) / len(depths)
+
+    def __repr__(self):
+        return f"RankedMove(swap={self.swap}, expectedScore={self.expectedScore:.2f}, expectedDepth={self.expectedDepth:.2f})"
+
+
+def simulateCascade(board: Board, swap: tuple[tuple, tuple], rng: random.Random) -> CascadeOutcome:
+    # Plays the swap on a copy with the game's scoring: one point per cleared cell per cascade step
+    board = board.copy()
+    board.rng = rng
+    board.swapPositions(board._viewTile(*swap[0]), board._viewTile(*swap[1]))
+    score = 0
+    depth = 0
+    while board.hasMatches():
+        depth += 1
+        mask = board.getMatchMask()
+        score += sum(mask)
+        board.clearMatches()
+        board.applyGravity()
+        Bejeweled.refillSolvable(board, rng)
+    return CascadeOutcome(score, depth, board)
+
+
+# (board state key, swap, refill seed) -> CascadeOutcome; outcomes are shared, so treat them as read-only
+_OUTCOME_CACHE = LRUCache(20000)
+
+def cachedCascade(board: Board, swap: tuple[tuple, tuple], seed: int) -> CascadeOutcome:
+    # A seeded cascade is fully determined by the board codes, the swap and the seed
+    key = (board.getStateKey(), swap, seed)
+    outcome = _OUTCOME_CACHE.get(key)
+    if outcome is None:
+        outcome = simulateCascade(board, swap, random.Random(seed))
+        _OUTCOME_CACHE.put(key, outcome)
+    return outcome
+
+
+def _sampleSeeds(seed: int, samples: int) -> list[int]:
+    # The same refill streams are used for every swap so rankings compare like with like
+    return [seed * 1000003 + sample for sample in range(samples)]
+
+
+def _playOut(board: Board, swap: tuple[tuple, tuple], seeds: list[int], followUp: bool) -> tuple[list[int], list[int]]:
+    scores = []
+    depths = []
+    for seed in seeds:
+        outcome = cachedCascade(board, swap, seed)
+        scores.append(outcome.score + (outcome.followUpScore() if followUp else 0))
+        depths.append(outcome.depth)
+    return scores, depths
+
+
+def _simulateTask(task: tuple) -> list[tuple[list[int], list[int]]]:
+    # One task per worker: the grid is rebuilt once and shared by every swap in the batch
+    grid, colorCount, swaps, seeds, followUp = task
+    board = Board.fromCodeGrid(grid, list(range(1, colorCount + 1)))
+    return [_playOut(board, swap, seeds, followUp) for swap in swaps]
+
+
+class BejeweledSolver:
+    def __init__(self, samples: int = 1, seed: int = 0, workers: int = 1, followUp: bool = True):
+        # samples=1 is a deterministic lookahead with one fixed refill stream; more samples
+        # average over that many refill streams (Monte-Carlo). Refills never create matches,
+        # so the refill only changes the score through followUp, the best next swap it leaves.
+        self.samples = samples
+        self.seed = seed
+        self.workers = workers
+        self.followUp = followUp
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def rank(self, board: Board) -> list[RankedMove]:
+        swaps = board.getValidSwaps()
+        seeds = _sampleSeeds(self.seed, self.samples)
+        if self.workers > 1 and swaps:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            grid = board.getCodeGrid()
+            # Swaps are dealt round-robin so each worker gets one batch of similar cost
+            batches = [swaps[start::self.workers] for start in range(min(self.workers, len(swaps)))]
+            tasks = [(grid, len(board.colors), batch, seeds, self.followUp) for batch in batches]
+            results = [None] * len(swaps)
+            for start, batchResults in enumerate(self._pool.map(_simulateTask, tasks)):
+                results[start::self.workers] = batchResults
+        else:
+            results = [_playOut(board, swap, seeds, self.followUp) for swap in swaps]
+        ranked = [RankedMove(swap, scores, depths) for swap, (scores, depths) in zip(swaps, results)]
+        ranked.sort(key=lambda move: (-move.expectedScore, -move.expectedDepth))
+        return ranked
+
+    def bestMove(self, board: Board) -> Optional[tuple[tuple, tuple]]:
+        ranked = self.rank(board)
+        return ranked[0].swap if ranked else None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_defaultSolver: Optional[BejeweledSolver] = None
+
+def solverPolicy(game: Bejeweled.Bejeweled, rng) -> tuple[tuple, tuple]:
+    # Batch-runner policy: best swap by a 4-sample Monte-Carlo cascade lookahead
+    global _defaultSolver
+    if _defaultSolver is None:
+        _defaultSolver = BejeweledSolver(samples=4)
+    return _defaultSolver.bestMove(game._board)
@@ -1,9 +1,63 @@
 # Import necessary modules
 import random
+import sys
+from array import array
+from collections import OrderedDict
 from enum import Enum
-from typing import List, Callable, Optional, Any, Set
+from functools import reduce
+from operator import add, xor
+from typing import List, Callable, Optional, Any, Set, Iterable, Iterator
 from abc import ABC, abstractmethod
 
+# LRUCache class
+class LRUCache:
+    # Size-capped mapping that evicts the least recently used entry
+    def __init__(self, maxSize: int):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Zobrist keys: one random 64-bit key per (cell index, code) in a table of cells x stride entries, so a
+# board's hash is the XOR of its cells' keys and a write updates it with two XORs. Tables come from a
+# fixed seed, so hashes agree across processes, and are shared by boards of the same size and stride.
+_ZOBRIST_TABLES = LRUCache(16)
+
+def _zobristTable(cells: int, stride: int) -> array:
+    table = _ZOBRIST_TABLES.get((cells, stride))
+    if table is None:
+        table = array('Q', random.Random(cells * 65537 + stride).randbytes(8 * cells * stride))
+        table[0::stride] = array('Q', bytes(8 * cells)) # Empty cells have key 0
+        _ZOBRIST_TABLES.put((cells, stride), table)
+    return table
+
+
 # Enum for Direction
 class Direction(Enum):
     UP = "UP"
@@ -18,12 +72,13 @@ class Direction(Enum):
 
 # TileContents class
 class TileContents:
-    def __init__(self, colors: List[Any]):
+    def __init__(self, colors: List[Any], rng: Optional[random.Random] = None):
         self.colors = colors
+        self.rng = rng if rng is not None else random
         self.content = self.getRandomContent()
 
     def getRandomContent(self) -> Any:
-        return random.choice(self.colors)
+        return self.rng.choice(self.colors)
 
     def swapPositions(self, tile: 'Tile') -> None:
         self.content, tile.contents.content = tile.contents.content, self.content
@@ -35,259 +90,998 @@ class TileContents:
         self.content = None
 
 
+# BoardTileContents class
+class BoardTileContents(TileContents):
+    # View of one Board cell: content is read from and written to the board's code array
+    def __init__(self, board: 'Board', index: int):
+        self.board = board
+        self.index = index
+
+    @property
+    def colors(self) -> List[Any]:
+        return self.board.colors
+
+    @property
+    def rng(self) -> random.Random:
+        return self.board.rng
+
+    @property
+    def content(self) -> Any:
+        return self.board._palette[self.board._cells[self.index]]
+
+    @content.setter
+    def content(self, content: Any) -> None:
+        self.board._setCode(self.index, self.board._encode(content))
+
+
+# BitBoard class
+class BitBoard:
+    # Occupancy as one int per row with bit c set when column c is filled. A piece is a
+    # {row: mask} dict, so bounds and collision checks are a shift and an AND per piece row.
+    def __init__(self, height: int, width: int, rows: Optional[List[int]] = None):
+        self.height = height
+        self.width = width
+        self.rows = list(rows) if rows is not None else [0] * height
+
+    def copy(self) -> 'BitBoard':
+        return BitBoard(self.height, self.width, self.rows)
+
+    def pieceMasks(self, positions: Iterable[tuple]) -> Optional[dict]:
+        # None if any position is off the board
+        piece = {}
+        for row, col in positions:
+            if not (0 <= row < self.height and 0 <= col < self.width):
+                return None
+            piece[row] = piece.get(row, 0) | 1 << col
+        return piece
+
+    def shifted(self, piece: dict, rows: int, cols: int) -> Optional[dict]:
+        # The piece moved by (rows, cols), or None if that takes it off the board
+        moved = {}
+        for row, mask in piece.items():
+            row += rows
+            if cols >= 0:
+                mask <<= cols
+            elif mask & ((1 << -cols) - 1):
+                return None
+            else:
+                mask >>= -cols
+            if not 0 <= row < self.height or mask >> self.width:
+                return None
+            moved[row] = mask
+        return moved
+
+    def fits(self, piece: Optional[dict], ignore: Optional[dict] = None) -> bool:
+        # True if the piece is on the board and overlaps nothing except cells in `ignore`
+        if piece is None:
+            return False
+        rows = self.rows
+        for row, mask in piece.items():
+            if not 0 <= row < self.height or mask >> self.width:
+                return False
+            occupied = rows[row]
+            if ignore:
+                occupied &= ~ignore.get(row, 0)
+            if mask & occupied:
+                return False
+        return True
+
+    def place(self, piece: dict) -> None:
+        for row, mask in piece.items():
+            self.rows[row] |= mask
+
+    def remove(self, piece: dict) -> None:
+        for row, mask in piece.items():
+            self.rows[row] &= ~mask
+
+    def clearFullRows(self) -> int:
+        # Drop full rows and shift the rows above down; returns how many were cleared
+        full = (1 << self.width) - 1
+        kept = [row for row in self.rows if row != full]
+        cleared = self.height - len(kept)
+        if cleared:
+            self.rows = [0] * cleared + kept
+        return cleared
+
+
 # TileShape class
 class TileShape:
+    # The falling shape lives off the board: its tiles are free-standing, keeping their own contents,
+    # and _masks mirrors their positions as {row: mask}, so moving the shape is a few mask operations
+    # and never writes a cell. settle() writes it into the board when it lands; until then
+    # drawGlyphs and drawCodes overlay it on the board's display and state.
     def __init__(self, hasGravity: bool, board: 'Board'):
         self.hasGravity = hasGravity
         self.board = board
         self.tiles = []
-    
+        self._masks: Optional[dict] = None # None when there is no falling shape
+
     def createTileShape(self, tiles: List['Tile']):
+        # Tiles already placed on the board are lifted off it, and any cell under the shape is
+        # emptied, as if the shape had been written over it
+        board = self.board
+        for tile in tiles:
+            if isinstance(tile.contents, BoardTileContents):
+                board._liftTile(tile)
+            elif board.isTileAt(tile.position[0], tile.position[1]):
+                board.setTileAt(tile.position[0], tile.position[1], None)
         self.tiles = tiles
+        self._masks = board._bits.pieceMasks([tile.position for tile in tiles]) if tiles else None
         self.hasGravity = False
+
+    def settle(self) -> None:
+        # Write the shape into the board where it is; its tiles become views of their cells
+        if self._masks is None:
+            return
+        for tile in self.tiles:
+            self.board._placeTile(tile.position[0], tile.position[1], tile)
+        self._masks = None
+
+    def _moveTo(self, positions: List[tuple]) -> bool:
+        if self._masks is None:
+            return False
+        bits = self.board._bits
+        masks = bits.pieceMasks(positions)
+        if not bits.fits(masks):
+            return False
+        for tile, position in zip(self.tiles, positions):
+            tile.position = position
+        self._masks = masks
+        return True
+
+    def _moveBy(self, delta_row: int, delta_col: int) -> bool:
+        # Translations shift the row masks instead of rebuilding them from positions
+        if self._masks is None:
+            return False
+        bits = self.board._bits
+        masks = bits.shifted(self._masks, delta_row, delta_col)
+        if not bits.fits(masks):
+            return False
+        for tile in self.tiles:
+            tile.position = (tile.position[0] + delta_row, tile.position[1] + delta_col)
+        self._masks = masks
+        return True
+
+    def canMove(self, delta_row: int, delta_col: int) -> bool:
+        bits = self.board._bits
+        return self._masks is not None and bits.fits(bits.shifted(self._masks, delta_row, delta_col))
+
+    def isLanded(self) -> bool:
+        return not self.canMove(1, 0)
+
+    def getDropDistance(self) -> int:
+        # Rows the shape can fall before landing, stepped on the row masks without touching the board
+        if self._masks is None:
+            return 0
+        bits = self.board._bits
+        piece = bits.shifted(self._masks, 1, 0)
+        distance = 0
+        while bits.fits(piece):
+            distance += 1
+            piece = bits.shifted(piece, 1, 0)
+        return distance
+
+    def getGhostPositions(self) -> List[tuple]:
+        # Where the shape would come to rest if dropped now
+        distance = self.getDropDistance()
+        return [(tile.position[0] + distance, tile.position[1]) for tile in self.tiles]
+
+    def hardDrop(self) -> int:
+        # Move the shape straight to its resting place; returns the rows fallen
+        distance = self.getDropDistance()
+        if distance:
+            self._moveBy(distance, 0)
+        return distance
     
-    def rotateTileShape(self):
+    def rotateTileShape(self) -> bool:
         if len(self.tiles) < 2:
-            return
+            return False
 
         pivot = self.tiles[0].position
-        new_tiles = []
-        
+        new_positions = []
         for tile in self.tiles:
             row, col = tile.position
             relative_row, relative_col = row - pivot[0], col - pivot[1]
-            
-            new_row = pivot[0] - relative_col
-            new_col = pivot[1] + relative_row
-            
-            if not self.board.isWithinBounds(new_row, new_col):
-                return
-            
-            if self.board.isTileAt(new_row, new_col) and self.board.board[new_row][new_col] not in self.tiles:
-                return
-            
-            new_tiles.append((new_row, new_col, tile.contents.content))
-        
-        for tile in self.tiles:
-            self.board.board[tile.position[0]][tile.position[1]].contents.clearContent()
-
-        for i, (tile, (new_row, new_col, content)) in enumerate(zip(self.tiles, new_tiles)):
-            self.board.setTileAt(new_row, new_col, content)
-            self.tiles[i] = self.board.getTileAt(new_row, new_col)
-
-
-    def moveTileShape(self):
-        if not self.tiles:
-            return
-        
-        new_tiles = []
-        
-        for tile in self.tiles:
-            new_row = tile.position[0] + 1
-            new_col = tile.position[1]
-            
-            if not self.board.isWithinBounds(new_row, new_col):
-                return
-            
-            if self.board.isTileAt(new_row, new_col) and self.board.board[new_row][new_col] not in self.tiles:
-                return
-            
-            new_tiles.append((new_row, new_col, tile.contents.content))
-        
-        for tile in self.tiles:
-            self.board.board[tile.position[0]][tile.position[1]].contents.clearContent()
+            new_positions.append((pivot[0] - relative_col, pivot[1] + relative_row))
+        return self._moveTo(new_positions)
 
-        for i, (tile, (new_row, new_col, content)) in enumerate(zip(self.tiles, new_tiles)):
-            self.board.setTileAt(new_row, new_col, content)
-            self.tiles[i] = self.board.getTileAt(new_row, new_col)
+    def moveTileShape(self) -> bool:
+        return self._moveBy(1, 0)
 
-
-    def shiftTileShape(self, direction: Direction):
+    def shiftTileShape(self, direction: Direction) -> bool:
         if direction == Direction.UP:
-            self.rotateTileShape()
+            return self.rotateTileShape()
         elif direction == Direction.DOWN:
-            self.moveTileShape()
+            return self.moveTileShape()
         else:
-            delta_col = -1 if direction == Direction.LEFT else 1
-            new_tiles = []
+            return self._moveBy(0, -1 if direction == Direction.LEFT else 1)
 
+    def drawGlyphs(self, glyphs: List[List[str]]) -> List[List[str]]:
+        # Overlay the falling shape on glyphs from board.getDisplayGlyphs(), in place
+        if self._masks is not None:
+            board = self.board
             for tile in self.tiles:
-                new_row, new_col = tile.position[0], tile.position[1] + delta_col
-                
-                if not self.board.isWithinBounds(new_row, new_col):
-                    return
-                
-                if self.board.isTileAt(new_row, new_col) and self.board.board[new_row][new_col] not in self.tiles:
-                    return
-                
-                new_tiles.append((new_row, new_col, tile.contents.content))
-            
-            for tile in self.tiles:
-                self.board.board[tile.position[0]][tile.position[1]].contents.clearContent()
+                glyphs[tile.position[0]][tile.position[1]] = board._glyph(board._encode(tile.contents.content), 0)
+        return glyphs
 
-            for i, (tile, (new_row, new_col, content)) in enumerate(zip(self.tiles, new_tiles)):
-                self.board.setTileAt(new_row, new_col, content)
-                self.tiles[i] = self.board.getTileAt(new_row, new_col)
+    def drawCodes(self, grid: List[List[int]]) -> List[List[int]]:
+        # Overlay the falling shape on a board.getCodeGrid() grid, in place
+        if self._masks is not None:
+            for tile in self.tiles:
+                grid[tile.position[0]][tile.position[1]] = self.board._encode(tile.contents.content)
+        return grid
 
 
 # Tile class
 class Tile:
     def __init__(self, position: tuple, colors: List[Any], board: 'Board'):
         self.position = position
-        self.contents = TileContents(colors)
+        self.contents = TileContents(colors, board.rng if board is not None else None)
         self.board = board
         self.partOfShape = None
 
+    def __eq__(self, other: object) -> bool:
+        # Tiles are views onto board cells, so two views of the same cell are the same tile
+        if not isinstance(other, Tile):
+            return NotImplemented
+        return self.board is other.board and self.position == other.position
+
+    def __hash__(self) -> int:
+        return hash(self.position)
+
     def __repr__(self):
         return repr(self.contents.content) if self.contents.content is not None else "   "
 
 
+# Row/grid views so existing board.board[i][j] code keeps working on top of the code array
+class _BoardRow:
+    def __init__(self, board: 'Board', row: int):
+        self._board = board
+        self._row = row
+
+    def _column(self, col: int) -> int:
+        if col < 0:
+            col += self._board.width
+        if not 0 <= col < self._board.width:
+            raise IndexError("board column out of range")
+        return col
+
+    def __getitem__(self, col: int) -> Tile:
+        return self._board._viewTile(self._row, self._column(col))
+
+    def __setitem__(self, col: int, tile: Tile) -> None:
+        self._board._placeTile(self._row, self._column(col), tile)
+
+    def __len__(self) -> int:
+        return self._board.width
+
+    def __iter__(self):
+        for col in range(self._board.width):
+            yield self._board._viewTile(self._row, col)
+
+
+class _BoardGrid:
+    def __init__(self, board: 'Board'):
+        self._board = board
+
+    def __getitem__(self, row: int) -> _BoardRow:
+        if row < 0:
+            row += self._board.height
+        if not 0 <= row < self._board.height:
+            raise IndexError("board row out of range")
+        return _BoardRow(self._board, row)
+
+    def __len__(self) -> int:
+        return self._board.height
+
+    def __iter__(self):
+        for row in range(self._board.height):
+            yield _BoardRow(self._board, row)
+
+
 # Board class
 class Board:
-    def __init__(self, height: int, width: int, colors: List[Any]):
+    def __init__(self, height: int, width: int, colors: List[Any], rng: Optional[random.Random] = None,
+                 fill: bool = True):
         self.height = height
         self.width = width
-        self.board = [[Tile((i, j), colors, self) for j in range(width)] for i in range(height)]
-        self.matchingFunction: Optional[Callable] = None
         self.colors = colors
+        # Anything with the random.Random interface; the random module itself by default
+        self.rng = rng if rng is not None else random
+        self.matchingFunction: Optional[Callable] = None
+        # Zobrist key table and its codes per cell, a power of two that grows with the palette
+        self._zobristKeys: Optional[array] = None
+        self._zobristStride = 0
+        self._hash: Optional[int] = None # None when it needs a full recount
+        # Cells hold integer codes into _palette, row-major in one flat array; code 0 is empty
+        self._palette: List[Any] = [None]
+        self._codes: dict = {}
+        self._colorCodes = [self._encode(color) for color in colors]
+        self._cells = array('H', [0]) * (height * width)
+        self._marks = bytearray(height * width)
+        self._bits = BitBoard(height, width)
+        # Byte lanes (see _matchStarts) of the cells that can start a horizontal run, two or more from the right edge
+        self._runLanes = int.from_bytes((bytes([1] * (width - 2)) + bytes(min(width, 2))) * height, "little")
+        self._hash = 0 # Empty cells have key 0
+        # Display caches: glyph strings by (code, flag) and each row's glyphs and joined text, None when dirty
+        self._glyphTable: dict = {}
+        self._rowGlyphs: List[Optional[List[str]]] = [None] * height
+        self._rowText: List[Optional[str]] = [None] * height
+        self._swapIndex: Optional['SwapIndex'] = None
+        self.board = _BoardGrid(self)
+        # fill=False leaves every cell empty and draws nothing from rng
+        if fill:
+            self.fillMissingTiles()
+
+    def _encode(self, content: Any) -> int:
+        if content is None:
+            return 0
+        code = self._codes.get(content)
+        if code is None:
+            code = len(self._palette)
+            self._palette.append(content)
+            self._codes[content] = code
+            if code >= self._zobristStride:
+                self._zobristStride = max(8, self._zobristStride * 2)
+                self._zobristKeys = _zobristTable(self.height * self.width, self._zobristStride)
+                self._hash = None
+        return code
+
+    def _setCode(self, index: int, code: int) -> None:
+        # Every single-cell write goes through here
+        old = self._cells[index]
+        self._cells[index] = code
+        self._marks[index] = 0
+        self._rowText[index // self.width] = None
+        if self._hash is not None:
+            base = index * self._zobristStride
+            self._hash ^= self._zobristKeys[base + old] ^ self._zobristKeys[base + code]
+        if (old == 0) != (code == 0):
+            self._bits.rows[index // self.width] ^= 1 << (index % self.width)
+        if self._swapIndex is not None:
+            self._swapIndex.dirty.add(index)
+
+    def _replaceCells(self, cells: array, rowBits: Optional[List[int]] = None, changed: Optional[Set[int]] = None) -> None:
+        # Every bulk write goes through here; pass rowBits when the new row masks are already known, and
+        # changed, the only indices whose codes may differ, to keep every other cell's cached state
+        old = self._cells
+        self._cells = cells
+        w = self.width
+        if changed is None:
+            self._marks = bytearray(len(cells))
+            self._rowText = [None] * self.height
+            self._hash = None
+            if self._swapIndex is not None:
+                self._swapIndex.stale = True
+        else:
+            marks = self._marks
+            rowText = self._rowText
+            keys = self._zobristKeys
+            stride = self._zobristStride
+            boardHash = self._hash
+            for index in changed:
+                marks[index] = 0
+                rowText[index // w] = None
+                if boardHash is not None:
+                    base = index * stride
+                    boardHash ^= keys[base + old[index]] ^ keys[base + cells[index]]
+            self._hash = boardHash
+            if self._swapIndex is not None:
+                self._swapIndex.dirty.update(changed)
+        if rowBits is None:
+            rowBits = [sum(1 << j for j, code in enumerate(cells[i * w:(i + 1) * w]) if code) for i in range(self.height)]
+        self._bits = BitBoard(self.height, self.width, rowBits)
+
+    def getHash(self) -> int:
+        # Zobrist hash of the cell codes, updated on every single-cell write; bulk writes leave it
+        # to be recounted here
+        if self._hash is None:
+            keys = self._zobristKeys
+            self._hash = reduce(xor, map(keys.__getitem__, map(add, range(0, len(keys), self._zobristStride), self._cells)), 0)
+        return self._hash
+
+    def getStateKey(self) -> tuple:
+        # Cache key for anything that depends only on the board's shape and codes
+        return (self.height, self.width, self.getHash())
+
+    def copy(self) -> 'Board':
+        # Independent board sharing this one's palette; the code array and swap index are copied
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.colors = list(self.colors)
+        board._palette = list(self._palette)
+        board._codes = dict(self._codes)
+        board._colorCodes = list(self._colorCodes)
+        board._cells = array('H', self._cells)
+        board._marks = bytearray(self._marks)
+        board._bits = self._bits.copy()
+        board._glyphTable = {}
+        board._rowGlyphs = [None] * self.height
+        board._rowText = [None] * self.height
+        board._swapIndex = None if self._swapIndex is None else self._swapIndex.copy(board)
+        board.board = _BoardGrid(board)
+        return board
+
+    def _viewTile(self, x: int, y: int) -> Tile:
+        tile = Tile.__new__(Tile)
+        tile.position = (x, y)
+        tile.contents = BoardTileContents(self, x * self.width + y)
+        tile.board = self
+        tile.partOfShape = None
+        return tile
+
+    def _placeTile(self, x: int, y: int, tile: Tile) -> None:
+        # Copy a free-standing tile's content into the cell and rebind the tile as a view of it
+        index = x * self.width + y
+        self._setCode(index, self._encode(tile.contents.content))
+        tile.position = (x, y)
+        tile.contents = BoardTileContents(self, index)
+        tile.board = self
+
+    def _liftTile(self, tile: Tile) -> None:
+        # Inverse of _placeTile: the tile keeps the cell's content as a free-standing tile and the cell is emptied
+        index = tile.position[0] * self.width + tile.position[1]
+        contents = TileContents.__new__(TileContents)
+        contents.colors = self.colors
+        contents.rng = self.rng
+        contents.content = self._palette[self._cells[index]]
+        tile.contents = contents
+        self._setCode(index, 0)
 
     def swapPositions(self, t1: Tile, t2: Tile) -> None:
-        t1.contents.swapPositions(t2)
+        i1 = t1.position[0] * self.width + t1.position[1]
+        i2 = t2.position[0] * self.width + t2.position[1]
+        c1 = self._cells[i1]
+        self._setCode(i1, self._cells[i2])
+        self._setCode(i2, c1)
 
     def clearBoard(self) -> None:
-        for i in range(self.height):
-            for j in range(self.width):
-                self.board[i][j].contents.content = None
+        self._replaceCells(array('H', [0]) * (self.height * self.width))
     
-    def clearHorizontal(self) -> None:
-        cleared_rows = 0
-        for i in range(len(self.board)):
-            if all(cell.contents.content for cell in self.board[i]):
-                cleared_rows += 1
-                for cell in self.board[i]:
-                    cell.contents.clearContent()
-                
-                for j in range(i, 0, -1):
-                    for k in range(len(self.board[j])):
-                        self.board[j][k].contents.content = self.board[j-1][k].contents.content
-
-    def clearMatches(self) -> None:
+    def getRowFill(self, row: int) -> int:
+        # Number of occupied cells in the row, from the row mask kept up to date on every write
+        return self._bits.rows[row].bit_count()
+
+    def isRowFull(self, row: int) -> bool:
+        return self._bits.rows[row] == (1 << self.width) - 1
+
+    def getBitBoard(self) -> BitBoard:
+        # Independent copy of the occupancy row masks
+        return self._bits.copy()
+
+    def clearFullRows(self, rows: Optional[Iterable[int]] = None) -> int:
+        # Drop every full row (only rows in `rows`, if given) and let the rows above fall into place,
+        # rebuilding the array from row slices in one pass. Returns the number of rows cleared.
+        candidates = range(self.height) if rows is None else rows
+        full = {row for row in candidates if 0 <= row < self.height and self.isRowFull(row)}
+        if not full:
+            return 0
+        w = self.width
+        cells = array('H', [0]) * (len(full) * w)
+        rowBits = [0] * len(full)
+        for row in range(self.height):
+            if row not in full:
+                cells.extend(self._cells[row * w:(row + 1) * w])
+                rowBits.append(self._bits.rows[row])
+        self._replaceCells(cells, rowBits)
+        return len(full)
+
+    def clearHorizontal(self) -> int:
+        return self.clearFullRows()
+
+    def clearMatches(self) -> bool:
+        mask = self.getMatchMask()
         matched = False
-        to_clear = set()
-
-        # Horizontal matches
-        for i in range(self.height):
-            for j in range(self.width - 2):
-                if self.board[i][j] and self.board[i][j + 1] and self.board[i][j + 2]:
-                    if self.board[i][j] == self.board[i][j + 1] and self.board[i][j + 1] == self.board[i][j + 2]:
-                        to_clear.update({(i, j), (i, j + 1), (i, j + 2)})
-                        matched = True
-
-        # Vertical matches
-        for j in range(self.width):
-            for i in range(self.height - 2):
-                if self.board[i][j] and self.board[i + 1][j] and self.board[i + 2][j]:
-                    if self.board[i][j] == self.board[i + 1][j] and self.board[i + 1][j] == self.board[i + 2][j]:
-                        to_clear.update({(i, j), (i + 1, j), (i + 2, j)})
-                        matched = True
-
-        # Clear matched tiles
-        for x, y in to_clear:
-            self.board[x][y].contents.clearContent()
-
+        for index, hit in enumerate(mask):
+            if hit:
+                self._setCode(index, 0)
+                matched = True
         return matched
 
-    def applyGravity(self) -> None:
-        # Make tiles fall down to fill empty spaces
-        for j in range(self.width):
-            empty_slots = []
-            for i in range(self.height - 1, -1, -1):
-                if self.board[i][j].contents.isEmpty():
-                    empty_slots.append(i)
-                elif empty_slots:
-                    # Move tile down to the first available empty slot
-                    empty_slot = empty_slots.pop(0)
-                    self.board[empty_slot][j].contents.content = self.board[i][j].contents.content
-                    self.board[i][j].contents.clearContent()
-                    empty_slots.append(i)
+    def applyGravity(self) -> List[tuple]:
+        # Make tiles fall down to fill empty spaces: each column is compacted into a copy of the cells
+        # with a write pointer that trails the read pointer up from the bottom, and the copy replaces
+        # the board in one bulk write that touches only the moved cells' caches.
+        # Returns ((from_row, col), (to_row, col)) for every tile that moved.
+        h, w = self.height, self.width
+        cells = array('H', self._cells)
+        moved = []
+        changed = set()
+        # After gravity column j is filled from row empty down, so bit j is set in exactly those rows
+        startRows = [0] * (h + 1)
+        for j in range(w):
+            write = (h - 1) * w + j
+            for index in range(write, -1, -w):
+                code = cells[index]
+                if code:
+                    if index != write:
+                        cells[write] = code
+                        cells[index] = 0
+                        moved.append(((index // w, j), (write // w, j)))
+                        changed.add(index)
+                        changed.add(write)
+                    write -= w
+            startRows[write // w + 1] |= 1 << j
+        if moved:
+            rowBits = []
+            bits = 0
+            for row in range(h):
+                bits |= startRows[row]
+                rowBits.append(bits)
+            self._replaceCells(cells, rowBits, changed)
+        return moved
 
     def fillMissingTiles(self) -> None:
-        # Replace empty tiles with new random tiles
-        for i in range(self.height):
-            for j in range(self.width):
-                if self.board[i][j].contents.isEmpty():
-                    self.board[i][j].contents.content = random.choice(self.colors)
+        # Replace empty tiles with new random tiles, drawing every colour in one call
+        empty = [index for index, code in enumerate(self._cells) if code == 0]
+        if not empty:
+            return
+        for index, code in zip(empty, self.rng.choices(self._colorCodes, k=len(empty))):
+            self._setCode(index, code)
     
+    def _allowedCodes(self, index: int) -> List[int]:
+        # Colour codes that would not complete a run of three through this cell
+        cells = self._cells
+        w = self.width
+        h = self.height
+        r, c = divmod(index, w)
+        forbidden = set()
+        left1 = cells[index - 1] if c >= 1 else 0
+        left2 = cells[index - 2] if c >= 2 else 0
+        right1 = cells[index + 1] if c + 1 < w else 0
+        right2 = cells[index + 2] if c + 2 < w else 0
+        up1 = cells[index - w] if r >= 1 else 0
+        up2 = cells[index - 2 * w] if r >= 2 else 0
+        down1 = cells[index + w] if r + 1 < h else 0
+        down2 = cells[index + 2 * w] if r + 2 < h else 0
+        for a, b in ((left1, left2), (right1, right2), (left1, right1),
+                     (up1, up2), (down1, down2), (up1, down1)):
+            if a and a == b:
+                forbidden.add(a)
+        return [code for code in self._colorCodes if code not in forbidden]
+
+    def getContentsWithoutMatch(self, x: int, y: int) -> List[Any]:
+        if not self.isWithinBounds(x, y):
+            return []
+        return [self._palette[code] for code in self._allowedCodes(x * self.width + y)]
+
+    def fillMissingTilesWithoutMatches(self) -> List[tuple]:
+        # Fill empty tiles with random colours that do not complete a run; returns the filled positions.
+        # A cell only falls back to a matching colour if every colour is ruled out.
+        filled = []
+        w = self.width
+        for index, code in enumerate(self._cells):
+            if code == 0:
+                allowed = self._allowedCodes(index)
+                self._setCode(index, self.rng.choice(allowed if allowed else self._colorCodes))
+                filled.append((index // w, index % w))
+        return filled
+
     def isTileAt(self, x: int, y: int) -> bool:
         if self.isWithinBounds(x, y):
-            return not self.board[x][y].contents.isEmpty()
+            return self._cells[x * self.width + y] != 0
             
     def getTileAt(self, x: int, y: int) -> Optional[Tile]:
         if self.isTileAt(x, y):
-            return self.board[x][y]
+            return self._viewTile(x, y)
+        return None
+
+    def getContentAt(self, x: int, y: int) -> Any:
+        if self.isWithinBounds(x, y):
+            return self._palette[self._cells[x * self.width + y]]
         return None
 
     def setTileAt(self, x: int, y: int, content: Tile) -> None:
         if self.isWithinBounds(x, y):
-            self.board[x][y].contents.content = content
+            self._setCode(x * self.width + y, self._encode(content))
+
+    def getCodeGrid(self) -> List[List[int]]:
+        # Plain rows of colour codes (0 for empty), for headless callers and serialisation
+        w = self.width
+        return [self._cells[i * w:(i + 1) * w].tolist() for i in range(self.height)]
+
+    @classmethod
+    def fromCodeGrid(cls, grid: List[List[int]], colors: List[Any], rng: Optional[random.Random] = None) -> 'Board':
+        # Inverse of getCodeGrid for boards whose palette is just their colours: code k is colors[k - 1]
+        board = cls(len(grid), len(grid[0]) if grid else 0, colors, rng, fill=False)
+        board._replaceCells(array('H', [code for row in grid for code in row]))
+        return board
 
     def isWithinBounds(self, x: int, y: int) -> bool:
         return 0 <= x < self.height and 0 <= y < self.width
 
-    def getBoardDisplay(self) -> str:
-        return "\n".join([" ".join([str(tile) for tile in row]) for row in self.board])
-    
-    def getMatchingSets(self) -> Set[Tile]:
-        matched_tiles = set()
-
-        # Horizontal matches
+    def markPositions(self, positions: Iterable[tuple]) -> None:
+        w = self.width
+        for x, y in positions:
+            self._marks[x * w + y] = 1
+            self._rowText[x] = None
+
+    def isMarked(self, x: int, y: int) -> bool:
+        return self.isWithinBounds(x, y) and self._marks[x * self.width + y] == 1
+
+    def _glyph(self, code: int, flag: int) -> str:
+        # flag 0 is the plain glyph, 1 the matching highlight and 2 str(content) for the match display.
+        # Built once per palette entry; contents are expected to always display the same way.
+        glyph = self._glyphTable.get((code, flag))
+        if glyph is None:
+            content = self._palette[code]
+            if flag == 2:
+                glyph = str(content)
+            elif content is None:
+                glyph = "   "
+            elif flag and hasattr(content, "display"):
+                glyph = content.display(True)
+            else:
+                glyph = repr(content)
+            self._glyphTable[(code, flag)] = glyph
+        return glyph
+
+    def _displayRow(self, i: int) -> str:
+        # Rebuilds the row's glyphs and text only if a write or mark touched it since the last call
+        text = self._rowText[i]
+        if text is None:
+            cells = self._cells
+            marks = self._marks
+            glyph = self._glyph
+            row = [glyph(cells[k], marks[k]) for k in range(i * self.width, (i + 1) * self.width)]
+            self._rowGlyphs[i] = row
+            text = self._rowText[i] = " ".join(row)
+        return text
+
+    def getDisplayGlyphs(self) -> List[List[str]]:
+        # One display string per cell, row by row, for renderers that redraw cell by cell
         for i in range(self.height):
-            for j in range(self.width - 2):
-                if (self.board[i][j].contents.content == self.board[i][j + 1].contents.content == 
-                    self.board[i][j + 2].contents.content and self.board[i][j].contents.content is not None):
-                    matched_tiles.update({self.board[i][j], self.board[i][j + 1], self.board[i][j + 2]})
+            self._displayRow(i)
+        return [list(row) for row in self._rowGlyphs]
 
-        # Vertical matches
-        for j in range(self.width):
-            for i in range(self.height - 2):
-                if (self.board[i][j].contents.content == self.board[i + 1][j].contents.content == 
-                    self.board[i + 2][j].contents.content and self.board[i][j].contents.content is not None):
-                    matched_tiles.update({self.board[i][j], self.board[i + 1][j], self.board[i + 2][j]})
+    def getBoardDisplay(self) -> str:
+        return "\n".join([self._displayRow(i) for i in range(self.height)])
+    
+    def _codeLanes(self) -> Iterator[int]:
+        # One byte-lane int per code with at least three cells (fewer can neither form nor complete a run):
+        # byte k is 1 when cell k holds that code, built by bytes.translate over the code array
+        raw = self._cells.tobytes()
+        low, high = (raw[0::2], raw[1::2]) if sys.byteorder == "little" else (raw[1::2], raw[0::2])
+        wide = len(self._palette) > 256
+        for code in range(1, len(self._palette)):
+            if low.count(code & 255) < 3:
+                continue
+            m = int.from_bytes(low.translate(_LANES[code & 255]), "little")
+            if wide:
+                m &= int.from_bytes(high.translate(_LANES[code >> 8]), "little")
+            yield m
+
+    def _matchStarts(self) -> tuple:
+        # Run starts as two byte-lane ints, horizontal and vertical: byte k of an int is 1 when cell k
+        # starts a run of three equal codes. Runs are shift-and-compare over each code's lanes:
+        # m & m >> 8 & m >> 16 along rows, m & m >> 8w & m >> 16w down columns.
+        key = self.getStateKey()
+        starts = _MATCH_CACHE.get(key)
+        if starts is None:
+            row = 8 * self.width
+            horizontal = vertical = 0
+            for m in self._codeLanes():
+                horizontal |= m & m >> 8 & m >> 16
+                vertical |= m & m >> row & m >> 2 * row
+            starts = (horizontal & self._runLanes, vertical)
+            _MATCH_CACHE.put(key, starts)
+        return starts
+
+    def hasMatches(self) -> bool:
+        horizontal, vertical = self._matchStarts()
+        return bool(horizontal or vertical)
+
+    def getMatchMask(self) -> bytearray:
+        # One byte per cell, row-major; 1 where the cell is part of a run of three or more
+        horizontal, vertical = self._matchStarts()
+        w = self.width
+        lanes = horizontal | horizontal << 8 | horizontal << 16 | vertical | vertical << 8 * w | vertical << 16 * w
+        return bytearray(lanes.to_bytes(len(self._cells), "little"))
+
+    def getMatchingRuns(self) -> List[List[tuple]]:
+        # Every maximal horizontal and vertical run of three or more, each as one list of positions
+        horizontal, vertical = self._matchStarts()
+        w = self.width
+        n = len(self._cells)
+        runs = []
+        for lanes, step in ((horizontal, 1), (vertical, w)):
+            starts = lanes.to_bytes(n, "little")
+            open_runs = {}
+            k = starts.find(1)
+            while k >= 0:
+                run = open_runs.pop(k, None)
+                if run is None:
+                    run = [k, k + step]
+                    runs.append(run)
+                run.append(k + 2 * step)
+                open_runs[k + step] = run
+                k = starts.find(1, k + 1)
+        return [[(k // w, k % w) for k in run] for run in runs]
 
-        return matched_tiles
+    def getMatchingSets(self) -> Set[Tile]:
+        w = self.width
+        return {self._viewTile(k // w, k % w) for k, hit in enumerate(self.getMatchMask()) if hit}
+
+    def matchesCreatedBySwap(self, p1: tuple, p2: tuple) -> Set[tuple]:
+        # Positions in runs of three or more through p1 or p2 if their contents were swapped.
+        # Only the rows and columns of the two cells are read and the board is left unchanged.
+        if not (self.isWithinBounds(*p1) and self.isWithinBounds(*p2)):
+            return set()
+        w = self.width
+        return {(k // w, k % w) for run in self._swapRuns(p1[0] * w + p1[1], p2[0] * w + p2[1]) for k in run}
+
+    def _swapCreatesMatch(self, i1: int, i2: int) -> bool:
+        # Same answer as bool(matchesCreatedBySwap) on flat indices, stopping at the first run
+        return next(self._swapRuns(i1, i2), None) is not None
+
+    def _swapRuns(self, i1: int, i2: int) -> Iterator[List[int]]:
+        # Runs of three or more, as flat indices, through either cell if their codes were swapped
+        cells = self._cells
+        w = self.width
+        n = len(cells)
+        c1, c2 = cells[i1], cells[i2]
+
+        def codeAt(k: int) -> int:
+            return c2 if k == i1 else c1 if k == i2 else cells[k]
+
+        for k, code in ((i1, c2), (i2, c1)):
+            if not code:
+                continue
+            first = k - k % w
+            for step, low, high in ((1, first, first + w), (w, 0, n)):
+                run = [k]
+                j = k - step
+                while j >= low and codeAt(j) == code:
+                    run.append(j)
+                    j -= step
+                j = k + step
+                while j < high and codeAt(j) == code:
+                    run.append(j)
+                    j += step
+                if len(run) >= 3:
+                    yield run
+
+    def _getSwapIndex(self) -> 'SwapIndex':
+        if self._swapIndex is None:
+            self._swapIndex = SwapIndex(self)
+        self._swapIndex.sync()
+        return self._swapIndex
+
+    def hasValidSwap(self) -> bool:
+        return len(self._getSwapIndex().swaps) > 0
+
+    def getValidSwaps(self) -> List[tuple]:
+        w = self.width
+        return [((i1 // w, i1 % w), (i2 // w, i2 % w)) for i1, i2 in sorted(self._getSwapIndex().swaps)]
 
     def clearTileSet(self, ts: Set[Tile]) -> None:
         for tile in ts:
-            tile.contents.clearContent()
+            self._setCode(tile.position[0] * self.width + tile.position[1], 0)
+
+    def clearPositions(self, positions: Iterable[tuple]) -> None:
+        w = self.width
+        for x, y in positions:
+            self._setCode(x * w + y, 0)
 
     def getMatchingBoardDisplay(self) -> str:
-        matched_tiles = self.getMatchingSets()
+        matched = self.getMatchMask()
+        cells = self._cells
+        glyph = self._glyph
+        w = self.width
 
         return "\n".join([ 
             " ".join(
-                str(tile.contents.content) if tile in matched_tiles else "." for tile in row
+                [glyph(cells[k], 2) if matched[k] else "." for k in range(i * w, (i + 1) * w)]
             )
-            for row in self.board
+            for i in range(self.height)
         ])
 
 
+# Match run starts by board state key, shared by every board
+_MATCH_CACHE = LRUCache(4096)
+
+# bytes.translate tables for the match engine: _LANES[b] maps byte b to 1 and every other byte to 0
+_LANES = [bytes(int(i == b) for i in range(256)) for b in range(256)]
+
+
+# SwapIndex class
+class SwapIndex:
+    # Every adjacent swap on a board that would create a run, as (index, index) pairs.
+    # Board writes only mark cells dirty; sync() re-checks the swaps near those cells.
+    def __init__(self, board: Board):
+        self.board = board
+        self.swaps: Set[tuple] = set()
+        self.dirty: Set[int] = set()
+        self.stale = True
+        self._columnLanes: Optional[tuple] = None
+
+    def rebuild(self) -> None:
+        # Every swap at once on the byte lanes of _codeLanes. A tile of code c moved into cell q from a
+        # neighbour p completes a run when q does not already hold c and two cells in line with q,
+        # other than p, hold c: e.g. from the left, q+1 and q+2, or two of q-w, q-2w, q+w, q+2w.
+        # Swapping two equal codes changes nothing, so it counts when either cell is already matched.
+        board = self.board
+        w = board.width
+        n = w * board.height
+        row = 8 * w
+        full, fromCol1, fromCol2, toCol2, toCol3 = self._lanes()
+        fromLeft = fromRight = fromAbove = fromBelow = equalAcross = equalDown = 0
+        for m in board._codeLanes():
+            left = m << 8 & fromCol1 # q - 1 holds c
+            right = m >> 8 & toCol2 # q + 1 holds c
+            up = m << row & full
+            down = m >> row
+            across = left & (m << 16 & fromCol2) | left & right | right & (m >> 16 & toCol3)
+            upDown = up & (m << 2 * row) | up & down | down & (m >> 2 * row)
+            other = full ^ m
+            fromLeft |= (right & m >> 16 & toCol3 | upDown) & left & other
+            fromRight |= (left & m << 16 & fromCol2 | upDown) & right & other
+            fromAbove |= (down & m >> 2 * row | across) & up & other
+            fromBelow |= (up & m << 2 * row | across) & down & other
+            equalAcross |= m & right
+            equalDown |= m & down
+        horizontal, vertical = board._matchStarts()
+        matched = horizontal | horizontal << 8 | horizontal << 16 | vertical | vertical << row | vertical << 2 * row
+        across = fromLeft >> 8 | fromRight | equalAcross & (matched | matched >> 8)
+        down = fromAbove >> row | fromBelow | equalDown & (matched | matched >> row)
+        self.swaps = set()
+        for lanes, step in ((across, 1), (down, w)):
+            found = lanes.to_bytes(n, "little")
+            k = found.find(1)
+            while k >= 0:
+                self.swaps.add((k, k + step))
+                k = found.find(1, k + 1)
+        self.dirty.clear()
+        self.stale = False
+
+    def _lanes(self) -> tuple:
+        # Byte lanes of every cell, and of the cells with at least one or two columns to their left
+        # or at least one or two to their right, so row shifts cannot wrap into the next row
+        if self._columnLanes is None:
+            w = self.board.width
+            h = self.board.height
+            self._columnLanes = tuple(int.from_bytes(bytes(int(low <= j < w - high) for j in range(w)) * h, "little")
+                                      for low, high in ((0, 0), (1, 0), (2, 0), (0, 1), (0, 2)))
+        return self._columnLanes
+
+    def copy(self, board: Board) -> 'SwapIndex':
+        # The same index for a copy of this board, so the copy only re-checks the cells it changes
+        index = SwapIndex(board)
+        index.swaps = set(self.swaps)
+        index.dirty = set(self.dirty)
+        index.stale = self.stale
+        index._columnLanes = self._columnLanes
+        return index
+
+    def sync(self) -> None:
+        board = self.board
+        w = board.width
+        h = board.height
+        # Re-checking one dirty cell's swaps one by one costs about as much as a vectorised
+        # rebuild of 400 cells, so past that point a rebuild is cheaper
+        if self.stale or len(self.dirty) * 400 >= h * w:
+            self.rebuild()
+            return
+        if not self.dirty:
+            return
+
+        # A swap depends on the cells within two of either end along its rows and columns,
+        # so a changed cell affects exactly the swaps with an end in that cross around it
+        pending = set()
+        for k in self.dirty:
+            r, c = divmod(k, w)
+            for rr, cc in ((r, c), (r, c - 1), (r, c - 2), (r, c + 1), (r, c + 2),
+                           (r - 1, c), (r - 2, c), (r + 1, c), (r + 2, c)):
+                if not (0 <= rr < h and 0 <= cc < w):
+                    continue
+                e = rr * w + cc
+                if cc + 1 < w:
+                    pending.add((e, e + 1))
+                if cc > 0:
+                    pending.add((e - 1, e))
+                if rr + 1 < h:
+                    pending.add((e, e + w))
+                if rr > 0:
+                    pending.add((e - w, e))
+        self.dirty.clear()
+
+        for i1, i2 in pending:
+            if board._swapCreatesMatch(i1, i2):
+                self.swaps.add((i1, i2))
+            else:
+                self.swaps.discard((i1, i2))
+
+
 # Player class
 class PlayerProfile:
-    def __init__(self, player_id: int, colors: List[str], height: int, width: int):
+    def __init__(self, player_id: int, colors: List[str], height: int, width: int, rng: Optional[random.Random] = None):
         self.player_id = player_id
-        self.board = Board(height, width, colors)
+        self.board = Board(height, width, colors, rng)
         self.score = 0
 
     def __repr__(self):
         return f"Player {self.player_id}"
 
 
+# StepResult class
+class StepResult:
+    # What one headless move did: events are plain dicts such as {"type": "match", ...}
+    def __init__(self, move: Any, valid: bool, scores: dict[int, int], events: List[dict],
+                 state: List[List[int]], gameOver: bool, reason: Optional[str] = None):
+        self.move = move
+        self.valid = valid
+        self.scores = scores
+        self.events = events
+        self.state = state
+        self.gameOver = gameOver
+        self.reason = reason
+
+    def __repr__(self):
+        return f"StepResult(move={self.move!r}, valid={self.valid}, scores={self.scores}, gameOver={self.gameOver})"
+
+
+# ScoreEvent class
+class ScoreEvent:
+    # Points for one matched run: only cells not already credited to an earlier run in the
+    # same cascade step count, so a step's points add up to the cells it clears
+    def __init__(self, player: int, length: int, cells: int, depth: int, multiplier: int):
+        self.player = player
+        self.length = length
+        self.cells = cells
+        self.depth = depth
+        self.multiplier = multiplier
+        self.points = cells * multiplier
+
+    def asEvent(self) -> dict:
+        return {"type": "score", "player": self.player, "length": self.length, "cells": self.cells,
+                "depth": self.depth, "multiplier": self.multiplier, "points": self.points}
+
+    def __repr__(self):
+        return f"ScoreEvent(player={self.player}, length={self.length}, depth={self.depth}, points={self.points})"
+
+
 # ShellGame class
 class ShellGame(ABC):
     @abstractmethod
     def playGame(self) -> Optional[dict[int, int]|None]:
         pass
 
+    # Headless play: games built with headless=True never sleep, print or read stdin,
+    # and are driven one move at a time through step()
+    @abstractmethod
+    def getLegalMoves(self) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def step(self, move: Any) -> StepResult:
+        pass
+
+    @abstractmethod
+    def isFinished(self) -> bool:
+        pass
+
+    @abstractmethod
+    def getState(self) -> List[List[int]]:
+        # Board as palette codes, the same form as StepResult.state
+        pass
+
+    def evaluateMove(self, move: Any) -> float:
+        # Immediate value of a legal move, used by greedy policies; games override this
+        return 0
+
+    @classmethod
+    def createHeadless(cls, players: int = 1, rng: Optional[random.Random] = None, metrics: Any = None) -> 'ShellGame':
+        # metrics is an optional TMGE_metrics.Metrics for the game's instrumentation hooks
+        return cls(headless=True, rng=rng, metrics=metrics)
+
+    def run(self, moves: Iterable[Any]) -> List[StepResult]:
+        results = []
+        for move in moves:
+            if self.isFinished():
+                break
+            results.append(self.step(move))
+        return results
+
 
 '''
 # Game logic to handle 2 players
@@ -368,8 +1162,6 @@ def play_game():
         ]
         for tile in initial_tiles:
             tile.contents.content = tile.contents.getRandomContent()  # Assign random content
-        for tile in initial_tiles:
-            player.board.board[tile.position[0]][tile.position[1]] = tile
         current_tile_shape.createTileShape(initial_tiles)
     
     spawnCurrentTileShape()
@@ -377,7 +1169,7 @@ def play_game():
     print("Game Start!")
     while True:
         print("\nCurrent Board:")
-        print(player.board.getBoardDisplay())
+        print("\n".join(" ".join(row) for row in current_tile_shape.drawGlyphs(player.board.getDisplayGlyphs())))
 
         # Ask the player for input to move or rotate the tile shape
         move = input("\nEnter your move (left, right, down, rotate, pass, exit): ").strip().lower()
@@ -414,6 +1206,7 @@ def play_game():
                 return  # Cancel movement if any tile is occupied by an external tile
 
         if landed:
+            current_tile_shape.settle()
             # Clear matching sets if any
             player.board.clearTileSet(player.board.getMatchingSets())
             # Check for game over condition
@@ -0,0 +1,205 @@
+import Bejeweled
+import Tetris
+import TMGE_render
+import argparse
+import asyncio
+import sys
+from abc import ABC, abstractmethod
+from typing import Optional, TextIO
+
+# Event-loop runtime for the games. A session reads commands from an asyncio.Queue while gravity ticks,
+# cascade stages and redraws are timed with asyncio.sleep, so any number of sessions can share one
+# thread and one event loop. Games run headless underneath; the session does all of the drawing.
+#   python TMGE_async.py tetris       play in the terminal, gravity keeps ticking while you type
+
+
+async def stdinReader() -> asyncio.StreamReader:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+async def readLines(reader: asyncio.StreamReader, commands: asyncio.Queue) -> None:
+    # Forwards each input line to the queue; None marks the end of input
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        await commands.put(line.decode().strip().lower())
+    await commands.put(None)
+
+
+class GameSession(ABC):
+    # One game driven by queued commands. Subclasses define play() and frame(); the frame is redrawn at
+    # most once per frameInterval, and only after something marked the session dirty.
+    def __init__(self, commands: Optional[asyncio.Queue] = None, out: Optional[TextIO] = None, frameInterval: float = 1 / 30):
+        self.commands = commands if commands is not None else asyncio.Queue()
+        self.renderer = TMGE_render.TerminalRenderer(out) if out is not None else None # None draws nothing
+        self.frameInterval = frameInterval
+        self.message = ""
+        self.dirty = True
+        self.finished = False
+
+    @abstractmethod
+    async def play(self) -> None:
+        pass
+
+    @abstractmethod
+    def frame(self) -> tuple[list[list[str]], list[str]]:
+        pass
+
+    async def run(self) -> None:
+        drawing = asyncio.create_task(self._drawLoop())
+        try:
+            await self.play()
+        finally:
+            self.finished = True
+            await drawing
+
+    async def nextCommand(self) -> Optional[str]:
+        # None when input has ended or the player asked to exit
+        command = await self.commands.get()
+        return None if command == "exit" else command
+
+    def _draw(self) -> None:
+        if self.renderer is not None and self.dirty:
+            self.dirty = False
+            self.renderer.render(*self.frame())
+
+    async def _drawLoop(self) -> None:
+        while not self.finished:
+            self._draw()
+            await asyncio.sleep(self.frameInterval)
+        self._draw()
+
+
+class TetrisSession(GameSession):
+    # Gravity runs on its own fixed tick instead of following each command
+    def __init__(self, game: Optional[Tetris.Tetris] = None, tickInterval: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.game = game if game is not None else Tetris.Tetris(headless=True)
+        self.tickInterval = tickInterval
+
+    def frame(self) -> tuple[list[list[str]], list[str]]:
+        text = ["", "Lines cleared: " + str(self.game.lines_cleared)]
+        if self.game.isFinished():
+            text.append("Game Over!")
+        return self.game.getDisplayGlyphs(), text + ["", "Enter your move (left, right, down, drop, rotate, exit):"]
+
+    async def play(self) -> None:
+        if not self.game.current_tile_shape.tiles:
+            self.game.spawn_shape()
+        tasks = {asyncio.create_task(self._gravity()), asyncio.create_task(self._controls())}
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _gravity(self) -> None:
+        while not self.game.isFinished():
+            await asyncio.sleep(self.tickInterval)
+            self.game.gravity_tick()
+            self.dirty = True
+
+    async def _controls(self) -> None:
+        while not self.game.isFinished():
+            command = await self.nextCommand()
+            if command is None:
+                return
+            if command in Tetris.MOVES:
+                self.game.apply_command(command)
+                if command == "drop":
+                    self.game.gravity_tick() # Land now rather than on the next tick
+                self.dirty = True
+
+
+class BejeweledSession(GameSession):
+    # Commands are "row col direction" (1-based, direction one of W/A/S/D) or H for a hint;
+    # each cascade stage stays on screen for stageInterval seconds
+    OFFSETS = {"w": (-1, 0), "a": (0, -1), "s": (1, 0), "d": (0, 1)}
+
+    def __init__(self, game: Optional[Bejeweled.Bejeweled] = None, stageInterval: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.game = game if game is not None else Bejeweled.Bejeweled.createHeadless(1)
+        self.stageInterval = stageInterval
+
+    def frame(self) -> tuple[list[list[str]], list[str]]:
+        text = self.game.getStatusLines() + ["", self.message]
+        if not self.game.isFinished():
+            text.append("Swap (row col W/A/S/D), or H for a hint:")
+        return self.game._board.getDisplayGlyphs(), text
+
+    def parseSwap(self, command: str) -> Optional[tuple[tuple, tuple]]:
+        try:
+            row, col, direction = command.split()
+            x, y = self.OFFSETS[direction]
+            first = (int(row) - 1, int(col) - 1)
+        except (ValueError, KeyError):
+            return None
+        return first, (first[0] + x, first[1] + y)
+
+    async def play(self) -> None:
+        while not self.game.isFinished():
+            command = await self.nextCommand()
+            if command is None:
+                return
+            self.dirty = True
+            if command == "h":
+                moves = self.game.getLegalMoves()
+                if not moves:
+                    self.message = "No moves available."
+                    continue
+                (x1, y1), (x2, y2) = moves[0]
+                self.message = "Hint: swap (" + str(x1 + 1) + " " + str(y1 + 1) + ") with (" + str(x2 + 1) + " " + str(y2 + 1) + ")"
+                continue
+            move = self.parseSwap(command)
+            if move is None:
+                self.message = "Invalid input. Please enter a valid position."
+                continue
+            self.message = ""
+            stages = self.game.stepStages(move)
+            while True:
+                try:
+                    next(stages)
+                except StopIteration as done:
+                    result = done.value
+                    break
+                self.dirty = True
+                await asyncio.sleep(self.stageInterval)
+            if not result.valid:
+                self.message = "Invalid input. Please enter a valid position."
+            elif result.reason == "no-match":
+                self.message = "Your move failed to cause a match. GAME OVER!"
+            elif result.gameOver:
+                self.message = "GAME OVER! Final score: " + str(result.scores)
+
+
+async def runSessions(sessions: list[GameSession]) -> None:
+    await asyncio.gather(*(session.run() for session in sessions))
+
+
+async def playInTerminal(session: GameSession) -> None:
+    feeding = asyncio.create_task(readLines(await stdinReader(), session.commands))
+    try:
+        await session.run()
+    finally:
+        feeding.cancel()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Play a TMGE game on the asyncio runtime.")
+    parser.add_argument("game", choices=["tetris", "bejeweled"])
+    parser.add_argument("--tick", type=float, default=0.5, help="seconds per gravity tick or cascade stage")
+    args = parser.parse_args(argv)
+    if args.game == "tetris":
+        session = TetrisSession(tickInterval=args.tick, out=sys.stdout)
+    else:
+        session = BejeweledSession(stageInterval=args.tick, out=sys.stdout)
+    asyncio.run(playInTerminal(session))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import TMGE
+import Bejeweled
+import Tetris
+import TetrisAI
+import BejeweledSolver
+import TMGE_replay
+import TMGE_metrics
+import argparse
+import csv
+import json
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+GAMES = {"bejeweled": Bejeweled.Bejeweled, "tetris": Tetris.Tetris}
+
+CSV_FIELDS = ["game", "policy", "seed", "scores", "turns", "max_cascade_depth", "cascade_depths", "reason"]
+
+
+# Policies take the game and a per-game random.Random and return one of game.getLegalMoves().
+# User-supplied policies must be module-level functions so worker processes can import them.
+def randomPolicy(game: TMGE.ShellGame, rng: random.Random) -> Any:
+    return rng.choice(game.getLegalMoves())
+
+def greedyPolicy(game: TMGE.ShellGame, rng: random.Random) -> Any:
+    moves = game.getLegalMoves()
+    rng.shuffle(moves)
+    return max(moves, key=game.evaluateMove)
+
+# "search" is Tetris only (TetrisAI placement search), "solver" is Bejeweled only (BejeweledSolver)
+POLICIES = {"random": randomPolicy, "greedy": greedyPolicy, "search": TetrisAI.searchPolicy,
+            "solver": BejeweledSolver.solverPolicy}
+
+
+def playOne(gameClass: type, policy: Callable, seed: int, players: int = 1, maxSteps: int = 10000,
+            record: bool = False, instrument: bool = False) -> dict:
+    # Independent streams for the game and the policy, both fixed by the seed.
+    # With record, the result also holds the game's binary log record under "log";
+    # with instrument, a TMGE_metrics snapshot of the game under "metrics".
+    rng = random.Random("policy:" + str(seed))
+    metrics = TMGE_metrics.Metrics() if instrument else None
+    recorder = TMGE_replay.GameRecorder(gameClass, seed, players, metrics) if record else None
+    game = recorder.game if recorder else gameClass.createHeadless(players, random.Random(seed), metrics)
+    cascadeDepths = []
+    turns = 0
+    result = None
+    while not game.isFinished() and turns < maxSteps:
+        result = (recorder or game).step(policy(game, rng))
+        turns += 1
+        depths = [event["depth"] for event in result.events if event["type"] == "match"]
+        if depths:
+            cascadeDepths.append(max(depths))
+    summary = {"game": gameClass.__name__,
+               "policy": policy.__name__,
+               "seed": seed,
+               "scores": result.scores if result else {},
+               "turns": turns,
+               "max_cascade_depth": max(cascadeDepths, default=0),
+               "cascade_depths": cascadeDepths,
+               "reason": (result.reason if result else None) or "max-steps"}
+    if recorder:
+        summary["log"] = recorder.finish().toBytes()
+    if metrics:
+        summary["metrics"] = metrics.snapshot()
+    return summary
+
+
+def _playSeed(task: tuple) -> dict:
+    return playOne(*task)
+
+
+def runBatch(gameClass: type, policy: Callable, seeds: Iterable[int], workers: int = 1,
+             players: int = 1, maxSteps: int = 10000, record: bool = False, instrument: bool = False) -> Iterator[dict]:
+    # Yields one result per seed, in seed order, as soon as it and every earlier seed are done
+    tasks = [(gameClass, policy, seed, players, maxSteps, record, instrument) for seed in seeds]
+    if workers <= 1:
+        for task in tasks:
+            yield _playSeed(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_playSeed, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+
+
+def writeResults(results: Iterable[dict], out, fmt: str = "jsonl") -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+    for result in results:
+        if fmt == "csv":
+            row = dict(result)
+            row["scores"] = json.dumps(row["scores"])
+            row["cascade_depths"] = json.dumps(row["cascade_depths"])
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(result) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+
+def _writeLogs(results: Iterable[dict], logFile) -> Iterator[dict]:
+    # Moves each result's log record into the open binary file
+    for result in results:
+        logFile.write(result.pop("log"))
+        yield result
+
+
+def _mergeMetrics(results: Iterable[dict], metrics: TMGE_metrics.Metrics) -> Iterator[dict]:
+    for result in results:
+        metrics.merge(result.pop("metrics"))
+        yield result
+
+
+def parseSeeds(text: str) -> range:
+    # "100" is seeds 0..99, "100:200" is seeds 100..199
+    if ":" in text:
+        start, stop = text.split(":")
+        return range(int(start), int(stop))
+    return range(int(text))
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Play many headless TMGE games and record one result per seed.")
+    parser.add_argument("--game", choices=sorted(GAMES), default="bejeweled")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seeds", default="100", help="N for seeds 0..N-1, or START:STOP")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--max-steps", type=int, default=10000)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--out", default="-", help="output file, or - for stdout")
+    parser.add_argument("--log", help="append a binary move log of every game to this file (see TMGE_replay.py)")
+    parser.add_argument("--metrics", help="write phase timing and counter histograms for the whole batch to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = runBatch(GAMES[args.game], POLICIES[args.policy], parseSeeds(args.seeds),
+                       args.workers, args.players, args.max_steps, args.log is not None, args.metrics is not None)
+    logFile = open(args.log, "ab") if args.log else None
+    if logFile:
+        results = _writeLogs(results, logFile)
+    metrics = TMGE_metrics.Metrics() if args.metrics else None
+    if metrics:
+        results = _mergeMetrics(results, metrics)
+    try:
+        if args.out == "-":
+            writeResults(results, sys.stdout, args.format)
+        else:
+            with open(args.out, "w", newline="") as out:
+                writeResults(results, out, args.format)
+    finally:
+        if logFile:
+            logFile.close()
+    if metrics:
+        with open(args.metrics, "w") as out:
+            metrics.write(out)
+
+
+if __name__ == '__main__':
+    main()
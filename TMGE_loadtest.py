@@ -0,0 +1,108 @@
+import TMGE_server
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Optional
+
+# Load-test client for TMGE_server: many connections, each driving several game sessions with random
+# legal moves, one request in flight per connection. Reports moves/sec and per-move latency percentiles.
+#   python TMGE_loadtest.py --connections 100 --sessions 20 --port 7122
+#   python TMGE_loadtest.py --local --connections 50      start a server in this process first
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: dict) -> dict:
+    writer.write(json.dumps(request, separators=(",", ":")).encode() + b"\n")
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply
+
+async def driveConnection(connect, game: str, sessions: int, maxMoves: int, seed: int, latencies: list) -> int:
+    # Plays each session to its end (or maxMoves) in turn; returns the number of moves made
+    reader, writer = await connect()
+    rng = random.Random(seed)
+    moves = 0
+    try:
+        for number in range(sessions):
+            sessionId = str(number)
+            reply = await _request(reader, writer, {"op": "new", "id": sessionId, "game": game,
+                                                    "seed": seed * 100003 + number, "withMoves": True})
+            for _ in range(maxMoves):
+                if not reply["moves"]:
+                    break
+                request = {"op": "move", "id": sessionId, "move": rng.choice(reply["moves"]), "withMoves": True}
+                start = time.perf_counter()
+                reply = await _request(reader, writer, request)
+                latencies.append(time.perf_counter() - start)
+                moves += 1
+                if reply["gameOver"]:
+                    break
+            await _request(reader, writer, {"op": "close", "id": sessionId})
+    finally:
+        writer.close()
+    return moves
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(moves: int, elapsed: float, latencies: list) -> dict:
+    ordered = sorted(latencies)
+    summary = {"moves": moves, "seconds": elapsed, "moves_per_s": moves / elapsed if elapsed else 0.0}
+    if ordered:
+        summary.update({"latency_median_ms": statistics.median(ordered) * 1e3,
+                        "latency_p95_ms": _percentile(ordered, 0.95) * 1e3,
+                        "latency_p99_ms": _percentile(ordered, 0.99) * 1e3,
+                        "latency_max_ms": ordered[-1] * 1e3})
+    return summary
+
+
+async def runLoad(game: str, connections: int, sessions: int, maxMoves: int, host: str = "127.0.0.1", port: int = 7122,
+                  unixPath: Optional[str] = None, local: bool = False) -> dict:
+    server = None
+    if local:
+        server = await TMGE_server.GameServer().start(host, 0 if unixPath is None else port, unixPath)
+        if unixPath is None:
+            port = server.sockets[0].getsockname()[1]
+
+    def connect():
+        if unixPath is not None:
+            return asyncio.open_unix_connection(unixPath)
+        return asyncio.open_connection(host, port)
+
+    latencies = []
+    start = time.perf_counter()
+    try:
+        counts = await asyncio.gather(*(driveConnection(connect, game, sessions, maxMoves, seed, latencies)
+                                        for seed in range(connections)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    return summarize(sum(counts), time.perf_counter() - start, latencies)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive many simulated sessions against a TMGE server.")
+    parser.add_argument("--game", choices=sorted(TMGE_server.GAMES), default="bejeweled")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=10, help="sessions played per connection")
+    parser.add_argument("--max-moves", type=int, default=200, help="moves per session at most")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7122)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--local", action="store_true", help="start a server in this process")
+    args = parser.parse_args(argv)
+    summary = asyncio.run(runLoad(args.game, args.connections, args.sessions, args.max_moves,
+                                  args.host, args.port, args.unix, args.local))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
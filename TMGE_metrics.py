@@ -0,0 +1,152 @@
+import contextlib
+import json
+import math
+import time
+from typing import Optional, TextIO
+
+# Instrumentation for the game turn pipeline. Games take an optional Metrics; when it is None every
+# hook is a None check or a shared no-op context, so uninstrumented play pays almost nothing.
+#   metrics = Metrics()                         in-process histograms and counters
+#   metrics = Metrics(events=open(path, "a"))   also stream every observation as a JSON line
+# Names are "<game>.<what>"; phase timers are "<game>.phase.<phase>" in seconds.
+
+NO_PHASE = contextlib.nullcontext()
+
+
+class Histogram:
+    # Log-scale buckets, eight per power of two (each spans at most 12.5%), so memory stays fixed
+    # however many values are observed; values <= 0 share one bucket
+    SUBBUCKETS = 8
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets: dict[int, int] = {}
+
+    def _bucket(self, value: float) -> int:
+        if value <= 0:
+            return -(1 << 30)
+        mantissa, exponent = math.frexp(value)
+        return exponent * self.SUBBUCKETS + int((mantissa - 0.5) * 2 * self.SUBBUCKETS)
+
+    def _lowerBound(self, bucket: int) -> float:
+        # Exact for integers up to 16, such as cascade depths and match sizes
+        if bucket == -(1 << 30):
+            return 0.0
+        exponent, sub = divmod(bucket, self.SUBBUCKETS)
+        return math.ldexp(0.5 + sub / (2 * self.SUBBUCKETS), exponent)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        # Lower edge of the bucket holding the given fraction of observations, within [min, max]
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._lowerBound(bucket), self.min), self.max)
+        return self.max
+
+    def merge(self, other: 'Histogram') -> None:
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def toDict(self) -> dict:
+        return {"count": self.count, "sum": self.total, "min": self.min, "max": self.max, "mean": self.mean(),
+                "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "buckets": self.buckets}
+
+    @classmethod
+    def fromDict(cls, data: dict) -> 'Histogram':
+        histogram = cls()
+        histogram.count = data["count"]
+        histogram.total = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        histogram.buckets = {int(bucket): count for bucket, count in data["buckets"].items()}
+        return histogram
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, events: Optional[TextIO] = None):
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+        self._events = events
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+        if self._events is not None:
+            self._events.write(json.dumps({"name": name, "value": value}) + "\n")
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+        if self._events is not None:
+            self._events.write(json.dumps({"name": name, "count": amount}) + "\n")
+
+    def time(self, name: str) -> _Timer:
+        return _Timer(self, name)
+
+    def histogram(self, name: str) -> Histogram:
+        return self.histograms.get(name) or Histogram()
+
+    def snapshot(self) -> dict:
+        return {"histograms": {name: histogram.toDict() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def merge(self, snapshot: dict) -> None:
+        # Adds another Metrics' snapshot, e.g. one sent back from a worker process
+        for name, data in snapshot["histograms"].items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.merge(Histogram.fromDict(data))
+        for name, amount in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def write(self, out: TextIO) -> None:
+        json.dump(self.snapshot(), out, indent=2)
+        out.write("\n")
+
+
+def phase(metrics: Optional[Metrics], name: str):
+    # `with phase(self.metrics, "tetris.phase.gravity"):` times the block only when metrics are enabled
+    return metrics.time(name) if metrics is not None else NO_PHASE
@@ -0,0 +1,71 @@
+import sys
+from typing import List, Optional, TextIO
+
+# Terminal output for the interactive games. A frame is a grid of fixed-width cell glyphs (the board)
+# followed by free text lines (status, scores). The renderer remembers the last frame it drew and
+# sends only the cells and lines that changed, addressed with cursor moves, in one write per frame.
+
+# ANSI control sequences; rows and columns are 1-based
+CLEAR_SCREEN = "\033[2J\033[H"
+ERASE_LINE_END = "\033[K"
+ERASE_BELOW = "\033[J"
+
+
+def moveTo(row: int, col: int) -> str:
+    return f"\033[{row};{col}H"
+
+def clearScreen(out: Optional[TextIO] = None) -> None:
+    out = out if out is not None else sys.stdout
+    out.write(CLEAR_SCREEN)
+    out.flush()
+
+
+class TerminalRenderer:
+    def __init__(self, out: Optional[TextIO] = None, cellWidth: int = 3):
+        self._out = out
+        self._cellWidth = cellWidth # Visible width of one glyph; glyphs are separated by one space
+        self._grid: Optional[List[List[str]]] = None
+        self._text: List[str] = []
+
+    def reset(self) -> None:
+        # Forget the last frame, e.g. after something else printed over it; the next frame repaints everything
+        self._grid = None
+        self._text = []
+
+    def render(self, grid: List[List[str]], text: List[str] = ()) -> None:
+        parts = []
+        last = self._grid
+        if last is None or len(last) != len(grid) or any(len(old) != len(new) for old, new in zip(last, grid)):
+            parts.append(CLEAR_SCREEN)
+            for i, row in enumerate(grid):
+                parts.append(moveTo(i + 1, 1) + " ".join(row))
+            lastText = []
+        else:
+            step = self._cellWidth + 1
+            for i, (old, new) in enumerate(zip(last, grid)):
+                if old == new:
+                    continue
+                written = -2 # Last cell written in this row; the cursor sits right after it
+                for j, glyph in enumerate(new):
+                    if glyph == old[j]:
+                        continue
+                    if written == j - 1:
+                        parts.append(" ") # Neighbouring cell: step over the separator instead of moving
+                    else:
+                        parts.append(moveTo(i + 1, j * step + 1))
+                    parts.append(glyph)
+                    written = j
+            lastText = self._text
+
+        top = len(grid) + 1
+        for t, line in enumerate(text):
+            if t >= len(lastText) or lastText[t] != line:
+                parts.append(moveTo(top + t, 1) + line + ERASE_LINE_END)
+        # Park the cursor under the frame and wipe whatever was printed there since the last frame
+        parts.append(moveTo(top + len(text), 1) + ERASE_BELOW)
+
+        self._grid = [list(row) for row in grid]
+        self._text = list(text)
+        out = self._out if self._out is not None else sys.stdout
+        out.write("".join(parts))
+        out.flush()
@@ -0,0 +1,161 @@
+import TMGE
+import Bejeweled
+import Tetris
+import argparse
+import mmap
+import random
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Iterator, Optional
+
+# Compact binary game logs. A log file is a plain concatenation of records, so files can be appended
+# to and concatenated freely. Each record is a fixed header followed by one byte per move:
+#   magic "TMGL", version, game kind, players, seed, move count, total score, CRC-32 of the final cells
+# Bejeweled moves are (first cell index << 1) | (1 if the swap is downward else 0), first cell being the
+# upper or left one and indexed row-major by the width of the game's board, so only the first 128 cells
+# can start a logged swap; Tetris moves are indexes into Tetris.MOVES. Only moves that were accepted
+# (StepResult.valid) are logged, so replaying the log with a game built from the seed must
+# end in exactly the logged state.
+#   python TMGE_replay.py games.tmgl            replay every game in the file and report mismatches
+
+MAGIC = b"TMGL"
+VERSION = 1
+KINDS = [Bejeweled.Bejeweled, Tetris.Tetris] # The game kind byte indexes this list; only ever append to it
+
+_HEADER = struct.Struct("<4sBBBxqIiI")
+
+
+def boardSize(game: TMGE.ShellGame) -> tuple[int, int]:
+    state = game.getState()
+    return len(state), len(state[0])
+
+def encodeMove(kind: int, move: Any, height: int, width: int) -> int:
+    if KINDS[kind] is Tetris.Tetris:
+        return Tetris.MOVES.index(move)
+    (x1, y1), (x2, y2) = sorted(move)
+    if not (0 <= x1 < height and 0 <= y1 < width):
+        raise ValueError(f"swap is outside the {height}x{width} board: {move}")
+    index = x1 * width + y1
+    if index >= 128:
+        raise ValueError(f"swap starts at cell {index}, past the 128 cells a move byte can hold: {move}")
+    return index << 1 | (x2 > x1)
+
+def decodeMove(kind: int, code: int, width: int) -> Any:
+    if KINDS[kind] is Tetris.Tetris:
+        return Tetris.MOVES[code]
+    index = code >> 1
+    first = (index // width, index % width)
+    return (first, (first[0] + 1, first[1]) if code & 1 else (first[0], first[1] + 1))
+
+def stateChecksum(state: list[list[int]]) -> int:
+    cells = [code for row in state for code in row]
+    return zlib.crc32(struct.pack(f"<{len(cells)}H", *cells))
+
+
+class GameLog:
+    def __init__(self, kind: int, seed: int, players: int, moves: bytes, score: int, checksum: int):
+        self.kind = kind
+        self.seed = seed
+        self.players = players
+        self.moves = moves
+        self.score = score
+        self.checksum = checksum
+
+    def newGame(self) -> TMGE.ShellGame:
+        return KINDS[self.kind].createHeadless(self.players, random.Random(self.seed))
+
+    def toBytes(self) -> bytes:
+        return _HEADER.pack(MAGIC, VERSION, self.kind, self.players, self.seed, len(self.moves),
+                            self.score, self.checksum) + self.moves
+
+    def __repr__(self):
+        return f"GameLog({KINDS[self.kind].__name__}, seed={self.seed}, moves={len(self.moves)}, score={self.score})"
+
+
+class GameRecorder:
+    # Wraps a headless game built from the seed and logs every accepted move passed to step()
+    def __init__(self, gameClass: type, seed: int, players: int = 1, metrics: Any = None):
+        self.kind = KINDS.index(gameClass)
+        self.seed = seed
+        self.players = players
+        self.game = gameClass.createHeadless(players, random.Random(seed), metrics)
+        self.height, self.width = boardSize(self.game)
+        self.moves = bytearray()
+        self.score = 0
+
+    def step(self, move: Any) -> TMGE.StepResult:
+        result = self.game.step(move)
+        if result.valid:
+            self.moves.append(encodeMove(self.kind, move, self.height, self.width))
+            self.score = sum(result.scores.values())
+        return result
+
+    def finish(self) -> GameLog:
+        return GameLog(self.kind, self.seed, self.players, bytes(self.moves), self.score,
+                       stateChecksum(self.game.getState()))
+
+
+def iterLogs(buffer: Any) -> Iterator[GameLog]:
+    # Records from any buffer, e.g. bytes or an mmap
+    offset = 0
+    end = len(buffer)
+    while offset < end:
+        magic, version, kind, players, seed, count, score, checksum = _HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a version {VERSION} game log record at byte {offset}")
+        offset += _HEADER.size
+        yield GameLog(kind, seed, players, bytes(buffer[offset:offset + count]), score, checksum)
+        offset += count
+
+def readLogs(path: str) -> Iterator[GameLog]:
+    with open(path, "rb") as logFile:
+        if not logFile.seek(0, 2):
+            return # mmap cannot map an empty file
+        with mmap.mmap(logFile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from iterLogs(buffer)
+
+def appendLogs(path: str, logs: list[GameLog]) -> None:
+    with open(path, "ab") as logFile:
+        logFile.write(b"".join(log.toBytes() for log in logs))
+
+
+def replay(log: GameLog) -> Optional[str]:
+    # Re-runs the log headless; None if it reaches the logged state, otherwise what differed
+    game = log.newGame()
+    width = boardSize(game)[1]
+    result = None
+    for number, code in enumerate(log.moves):
+        result = game.step(decodeMove(log.kind, code, width))
+        if not result.valid:
+            return f"move {number} was rejected"
+    score = sum(result.scores.values()) if result else 0
+    if score != log.score:
+        return f"score {score} != logged {log.score}"
+    if stateChecksum(game.getState()) != log.checksum:
+        return "final state differs"
+    return None
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay TMGE game logs and check their final states.")
+    parser.add_argument("logs", nargs="+", help="log files written by TMGE_batch.py --log")
+    args = parser.parse_args(argv)
+    games = moves = failures = 0
+    start = time.perf_counter()
+    for path in args.logs:
+        for log in readLogs(path):
+            problem = replay(log)
+            games += 1
+            moves += len(log.moves)
+            if problem is not None:
+                failures += 1
+                print(f"{path}: {log}: {problem}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {moves} moves replayed in {elapsed:.2f} s, {failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import Bejeweled
+import Tetris
+import argparse
+import asyncio
+import json
+import random
+import sys
+from typing import Any, Optional
+
+# Multi-session game server. Clients speak newline-delimited JSON over TCP or a Unix socket; each
+# connection can hold any number of headless game sessions, addressed by a client-chosen id.
+#   {"op": "new", "id": "a", "game": "bejeweled", "seed": 1}     -> full state: height, width, cells
+#   {"op": "move", "id": "a", "move": [[0, 0], [0, 1]]}          -> changed cells since the last reply
+#   {"op": "moves", "id": "a"} / {"op": "close", "id": "a"}
+# Cells are row-major palette codes; a diff is a flat [index, code, index, code, ...] list. Add
+# "withMoves": true to new or move requests to get the legal moves back with the reply.
+#   python TMGE_server.py --port 7122          or          python TMGE_server.py --unix /tmp/tmge.sock
+
+GAMES = {"bejeweled": Bejeweled.Bejeweled, "tetris": Tetris.Tetris}
+MAX_PLAYERS = 8
+
+
+def _flatten(grid: list[list[int]]) -> list[int]:
+    return [code for row in grid for code in row]
+
+def _diff(old: list[int], new: list[int]) -> list[int]:
+    changed = []
+    for index, (a, b) in enumerate(zip(old, new)):
+        if a != b:
+            changed += (index, b)
+    return changed
+
+def _decodeMove(move: Any) -> Any:
+    # JSON has no tuples: [[r, c], [r, c]] swaps become ((r, c), (r, c)); other moves pass through
+    if isinstance(move, list):
+        return tuple(_decodeMove(part) for part in move)
+    return move
+
+
+class ServerSession:
+    def __init__(self, game: Any):
+        self.game = game
+        self.cells: list[int] = []
+
+    def update(self, grid: list[list[int]]) -> list[int]:
+        # Cells changed since the last update, and remembers the new state
+        cells = _flatten(grid)
+        changed = _diff(self.cells, cells)
+        self.cells = cells
+        return changed
+
+
+class GameServer:
+    def __init__(self):
+        self.connections = 0
+        self.sessions = 0
+        self.moves = 0
+
+    def newSession(self, request: dict) -> tuple[ServerSession, dict]:
+        gameClass = GAMES[request["game"]]
+        seed = request.get("seed")
+        players = request.get("players", 1)
+        if type(players) is not int or not 1 <= players <= MAX_PLAYERS:
+            raise ValueError(f"players must be an integer from 1 to {MAX_PLAYERS}: {players!r}")
+        rng = random.Random(seed) if seed is not None else random.Random()
+        session = ServerSession(gameClass.createHeadless(players, rng))
+        grid = session.game.getState()
+        session.cells = _flatten(grid)
+        return session, {"height": len(grid), "width": len(grid[0]), "cells": session.cells}
+
+    def handle(self, sessions: dict, request: dict) -> dict:
+        op = request["op"]
+        sessionId = request["id"]
+        reply = {"id": sessionId}
+        if op == "new":
+            session, state = self.newSession(request)
+            sessions[sessionId] = session
+            self.sessions += 1
+            reply.update(state)
+        elif op == "close":
+            sessions.pop(sessionId)
+            return reply
+        else:
+            session = sessions[sessionId]
+            if op == "move":
+                result = session.game.step(_decodeMove(request["move"]))
+                self.moves += 1
+                reply.update({"valid": result.valid, "scores": result.scores, "changed": session.update(result.state),
+                              "gameOver": result.gameOver, "reason": result.reason})
+            elif op != "moves":
+                raise KeyError(op)
+        if op == "moves" or request.get("withMoves"):
+            reply["moves"] = sessions[sessionId].game.getLegalMoves()
+        return reply
+
+    async def serveClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        sessions = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = self.handle(sessions, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"error": type(e).__name__ + ": " + str(e)}
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7122, unixPath: Optional[str] = None) -> asyncio.AbstractServer:
+        if unixPath is not None:
+            return await asyncio.start_unix_server(self.serveClient, unixPath)
+        return await asyncio.start_server(self.serveClient, host, port)
+
+
+async def serve(host: str, port: int, unixPath: Optional[str]) -> None:
+    server = await GameServer().start(host, port, unixPath)
+    print("Serving on " + ", ".join(str(sock.getsockname()) for sock in server.sockets), file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve headless TMGE game sessions over sockets.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7122)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
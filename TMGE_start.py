@@ -1,6 +1,8 @@
 import TMGE
 import Bejeweled
 import Tetris
+import TMGE_render
+from TMGE_store import PlayerAccount, PlayerStore, DEFAULT_PATH
 from time import sleep
 
 GAME_SELECT_ART_1 = """.... .....-+**#*+-.....  .
@@ -62,23 +64,15 @@ GAME_SELECT_ART_3 = """........:*##%%%#+.........
 
 ANIMATION = [GAME_SELECT_ART_1, GAME_SELECT_ART_2, GAME_SELECT_ART_3]
 
-class PlayerAccount:
-    def __init__(self, name, id):
-        self.name = name
-        self.id = id
-        self.totalScore = 0
-
 class MenuOption:
     def __init__(self, name, activation_function):
         self.name = name
         self.run = activation_function
 
 class TMGEshell:
-    def __init__(self):
+    def __init__(self, store: PlayerStore = None):
         self._stillRunning = True
-        self._next_player_id = 0
-        self._players: dict[str, PlayerAccount] = dict()
-        self._players_list: list[PlayerAccount] = list()
+        self._store = store if store is not None else PlayerStore(DEFAULT_PATH)
 
         def playBejeweled():
             game = Bejeweled.Bejeweled(self.playerAccountsToPlayerProfiles(self.selectPlayers(1)))
@@ -92,11 +86,19 @@ class TMGEshell:
         def viewPlayerProfiles():
             self.clearScreen()
             print("PLAYERS LIST:")
-            for player in self._players_list:
+            for player in self._store.players():
                 print(f"{player.name}, {player.totalScore}")
             print("\n(press enter when finished viewing)")
             input()
 
+        def viewLeaderboard():
+            self.clearScreen()
+            print("LEADERBOARD:")
+            for rank, player in enumerate(self._store.leaderboard(10), 1):
+                print(f"{rank}. {player.name}, {player.totalScore}")
+            print("\n(press enter when finished viewing)")
+            input()
+
         def playTetris():
             Tetris.Tetris().playGame()
             print("\n(press enter when finished viewing)")
@@ -110,25 +112,20 @@ class TMGEshell:
                          MenuOption("Play BejeweledVs", playBejeweledVs),
                          MenuOption("Play Tetris", playTetris),
                          MenuOption("View Player Profiles", viewPlayerProfiles),
+                         MenuOption("View Leaderboard", viewLeaderboard),
                          MenuOption("Add Player Profile", self.addPlayerProfile)]
 
     def register_player(self, name: str) -> bool:
-        if name not in self._players_list:
-            new_player = PlayerAccount(name, self._next_player_id)
-            self._players[name] = new_player
-            self._players_list.append(new_player)
-            self._next_player_id += 1
-            return True
-        return False
+        return self._store.register(name)
     
     def storeResults(self, results: dict[int, int]):
-        for player_id, player_score in results.items():
-            self._players_list[player_id].totalScore += player_score
+        self._store.addScores(results)
 
     def start(self):
         self.register_player("Guest")
         self.addPlayerProfile()
         self.gameSelectScreen()
+        self._store.close()
         print('\nBye!')
 
     def addPlayerProfile(self):
@@ -167,17 +164,17 @@ class TMGEshell:
             return option_selected
 
     def clearScreen(self):
-        print("\n" * 40)
+        TMGE_render.clearScreen()
     
     def playAnimation(self):
+        renderer = TMGE_render.TerminalRenderer()
         for i in range(0, 3):
             for frame in ANIMATION:
-                self.clearScreen()
-                print(frame)
+                renderer.render([], frame.split("\n"))
                 sleep(0.1)
     
     def selectPlayerOptions(self) -> PlayerAccount:
-        playerList = self._players_list
+        playerList = list(self._store.players())
         self.showOptions("PLAYER", playerList)
         selected: int = self.takeOptionInput("PLAYER", playerList)
         return playerList[selected]
@@ -0,0 +1,73 @@
+import sqlite3
+from typing import Iterator, Optional
+
+# Persistent player profiles in SQLite. Names and ids are both indexed, so lookups never scan, and
+# accounts are read from disk only when asked for; each game's scores are written in one transaction.
+
+DEFAULT_PATH = "tmge_players.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    games INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_by_score ON players (total_score DESC);
+"""
+
+
+class PlayerAccount:
+    def __init__(self, name, id, totalScore=0, games=0):
+        self.name = name
+        self.id = id
+        self.totalScore = totalScore
+        self.games = games
+
+    def __repr__(self):
+        return f"PlayerAccount({self.name!r}, id={self.id}, totalScore={self.totalScore})"
+
+
+class PlayerStore:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _account(self, row: Optional[tuple]) -> Optional[PlayerAccount]:
+        return PlayerAccount(row[1], row[0], row[2], row[3]) if row else None
+
+    def register(self, name: str) -> bool:
+        # False if the name is already taken
+        with self._db:
+            return self._db.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,)).rowcount == 1
+
+    def getByName(self, name: str) -> Optional[PlayerAccount]:
+        return self._account(self._db.execute("SELECT id, name, total_score, games FROM players WHERE name = ?",
+                                              (name,)).fetchone())
+
+    def getById(self, player_id: int) -> Optional[PlayerAccount]:
+        return self._account(self._db.execute("SELECT id, name, total_score, games FROM players WHERE id = ?",
+                                              (player_id,)).fetchone())
+
+    def addScores(self, results: dict[int, int]) -> None:
+        # One game's results, by player id, applied together or not at all
+        with self._db:
+            self._db.executemany("UPDATE players SET total_score = total_score + ?, games = games + 1 WHERE id = ?",
+                                 [(score, player_id) for player_id, score in results.items()])
+
+    def players(self) -> Iterator[PlayerAccount]:
+        # Every account in registration order, read from disk as the caller iterates
+        for row in self._db.execute("SELECT id, name, total_score, games FROM players ORDER BY id"):
+            yield self._account(row)
+
+    def leaderboard(self, n: int = 10) -> list[PlayerAccount]:
+        # The n highest totals, read through the score index
+        return [self._account(row) for row in self._db.execute(
+            "SELECT id, name, total_score, games FROM players ORDER BY total_score DESC, id LIMIT ?", (n,))]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM players").fetchone()[0]
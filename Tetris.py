@@ -1,64 +1,131 @@
 from TMGE import *
+from TMGE_render import TerminalRenderer
+from TMGE_metrics import Metrics, phase
 import random
 
 shapes = {0 : ((1, 4), (1, 5), (1, 6), (1, 7)), 1 : ((0, 5), (0, 6), (1, 5), (1, 6)), 2 : ((0, 4), (1, 4), (1, 5), (1, 6)),\
           3 : ((1, 5), (1, 6), (1, 7), (0, 7)), 4 : ((0, 5), (1, 4), (1, 5), (1, 6)), 5: ((1, 5), (1, 6), (0, 6), (0, 7)),\
             6 : ((0, 5), (0, 6), (1, 6), (1, 7))}
 
+MOVES = ["left", "right", "down", "drop", "rotate", "pass"]
+
 class Tetris(ShellGame):
-    def __init__(self):
+    def __init__(self, headless: bool = False, rng: Optional[random.Random] = None, metrics: Optional[Metrics] = None):
+        self.metrics = metrics # Phase timings and counters under "tetris.", off when None
+        self.headless = headless
+        self.rng = rng if rng is not None else random
         self.colors = ['X']
-        self.player = PlayerProfile(1, self.colors, 20, 10)
+        self.player = PlayerProfile(1, self.colors, 20, 10, self.rng)
         self.player.board.clearBoard()
         self.current_tile_shape = TileShape(True, self.player.board)
+        self.next_shape_id = None
+        self.lines_cleared = 0
+        self.finished = False
+        self.finish_reason = None
+        self.events = []
 
     def spawn_shape(self):
-        shape = shapes[random.randint(0, 6)]
+        if self.next_shape_id is None:
+            self.next_shape_id = self.rng.randint(0, 6)
+        shape = shapes[self.next_shape_id]
+        self.next_shape_id = self.rng.randint(0, 6)
         tiles = [Tile(pos, self.colors, self.player.board) for pos in shape]
-        for tile in tiles:
-            self.player.board.board[tile.position[0]][tile.position[1]] = tile
         self.current_tile_shape.createTileShape(tiles)
 
     def playGame(self):
         self.spawn_shape()
 
-        print("Game Start!")
+        renderer = TerminalRenderer()
         while True:
-            print("\nCurrent Board:")
-            print(self.player.board.getBoardDisplay())
+            renderer.render(self.getDisplayGlyphs(), ["", "Lines cleared: " + str(self.lines_cleared)])
 
-            move = input("\nEnter your move (left, right, down, rotate, pass, exit): ").strip().lower()
+            with phase(self.metrics, "tetris.phase.input"):
+                move = input("\nEnter your move (left, right, down, drop, rotate, pass, exit): ").strip().lower()
             if move == "exit":
                 print("Exiting game.")
                 break
-            elif move == "left":
+            if self.apply_move(move):
+                print("Game Over!")
+                break
+
+    def apply_move(self, move: str) -> bool:
+        # Apply one command plus the gravity step that follows it; returns True when the game is over
+        self.apply_command(move)
+        return self.gravity_tick()
+
+    def apply_command(self, move: str):
+        # Move the falling shape without the gravity step, for runtimes that schedule gravity themselves
+        with phase(self.metrics, "tetris.phase.move"):
+            if move == "left":
                 self.current_tile_shape.shiftTileShape(Direction.LEFT)
             elif move == "right":
                 self.current_tile_shape.shiftTileShape(Direction.RIGHT)
             elif move == "down":
                 self.current_tile_shape.shiftTileShape(Direction.DOWN)
+            elif move == "drop":
+                self.current_tile_shape.hardDrop()
             elif move == "rotate":
                 self.current_tile_shape.shiftTileShape(Direction.UP)
 
+    def gravity_tick(self) -> bool:
+        # Drop the falling shape one row, or land it; returns True when the game is over
+        with phase(self.metrics, "tetris.phase.gravity"):
             self.current_tile_shape.moveTileShape()
 
-            landed = False
-            for tile in self.current_tile_shape.tiles:
-                if tile.position[0] == self.player.board.height - 1:
-                    landed = True
-                    break
-                
-                if self.player.board.isTileAt(tile.position[0] + 1, tile.position[1]) \
-                    and self.player.board.board[tile.position[0] + 1][tile.position[1]] not in self.current_tile_shape.tiles:
-                    landed = True
-                    break
-
-            if landed:
-                self.player.board.clearHorizontal()
-                if any(tile.position[0] == 0 for tile in self.current_tile_shape.tiles):
-                    print("Game Over!")
-                    break
-                self.spawn_shape()
+        if self.current_tile_shape.isLanded():
+            self.events.append({"type": "land"})
+            self.current_tile_shape.settle()
+            with phase(self.metrics, "tetris.phase.clear"):
+                cleared = self.player.board.clearFullRows({tile.position[0] for tile in self.current_tile_shape.tiles})
+            if self.metrics is not None:
+                self.metrics.count("tetris.landings")
+                self.metrics.observe("tetris.lines_cleared", cleared)
+            if cleared:
+                self.lines_cleared += cleared
+                self.events.append({"type": "lines", "count": cleared})
+            if any(tile.position[0] == 0 for tile in self.current_tile_shape.tiles):
+                self.finished = True
+                self.finish_reason = "topout"
+                self.events.append({"type": "gameOver", "reason": self.finish_reason})
+                return True
+            self.spawn_shape()
+        return False
+
+    def getDisplayGlyphs(self) -> list[list[str]]:
+        # Board glyphs with the falling shape drawn over its landing spot, marked as " . "
+        board = self.player.board
+        glyphs = board.getDisplayGlyphs()
+        if self.current_tile_shape.tiles:
+            for row, col in self.current_tile_shape.getGhostPositions():
+                if not board.isTileAt(row, col):
+                    glyphs[row][col] = " . "
+        return self.current_tile_shape.drawGlyphs(glyphs)
+
+    def getBoardDisplay(self) -> str:
+        return "\n".join([" ".join(row) for row in self.getDisplayGlyphs()])
+
+    def getScores(self) -> dict[int, int]:
+        return {self.player.player_id: self.lines_cleared}
+
+    def getLegalMoves(self) -> list[str]:
+        return list(MOVES)
+
+    def isFinished(self) -> bool:
+        return self.finished
+
+    def getState(self) -> list[list[int]]:
+        # Settled cells with the falling shape drawn in
+        return self.current_tile_shape.drawCodes(self.player.board.getCodeGrid())
+
+    def step(self, move: str) -> StepResult:
+        if not self.current_tile_shape.tiles:
+            self.spawn_shape()
+        if self.finished or move not in MOVES:
+            return StepResult(move, False, self.getScores(), [], self.getState(), self.finished, self.finish_reason)
+        self.events = []
+        with phase(self.metrics, "tetris.phase.turn"):
+            self.apply_move(move)
+        return StepResult(move, True, self.getScores(), self.events, self.getState(), self.finished, self.finish_reason)
             
 if __name__ == '__main__':
     tetris = Tetris()
@@ -0,0 +1,234 @@
+from TMGE import *
+import Tetris
+from typing import Callable, Optional
+
+# Placement search for Tetris. Candidate placements are found by searching the commands of
+# Tetris.step, simulated on BitBoard copies of the settled stack, never on the game's Board,
+# and scored by a pluggable evaluator.
+
+class Placement:
+    def __init__(self, path: list[str], positions: list[tuple], score: float):
+        self.path = path # Tetris commands, one per step, that bring the shape to rest here
+        self.positions = positions
+        self.score = score
+
+    def __repr__(self):
+        return f"Placement(path={self.path}, score={self.score:.3f})"
+
+
+def columnHeights(bits: BitBoard) -> list[int]:
+    heights = [0] * bits.width
+    seen = 0
+    for row, mask in enumerate(bits.rows):
+        new = mask & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = bits.height - row
+            new ^= low
+        seen |= mask
+    return heights
+
+def countHoles(bits: BitBoard) -> int:
+    # Empty cells with a filled cell somewhere above them in the same column
+    holes = 0
+    above = 0
+    for mask in bits.rows:
+        holes += (above & ~mask).bit_count()
+        above |= mask
+    return holes
+
+def defaultEvaluator(bits: BitBoard, lines: int) -> float:
+    # Weighted aggregate height, cleared lines, holes and bumpiness
+    heights = columnHeights(bits)
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return -0.51 * sum(heights) + 0.76 * lines - 0.36 * countHoles(bits) - 0.18 * bumpiness
+
+
+class _Mover:
+    # The falling shape under Tetris.step on one settled stack. A state is (turns, row, col): quarter
+    # turns taken and the position of the first tile, which TileShape.rotateTileShape turns about,
+    # so each turn maps a tile's offset (dr, dc) from it to (-dc, dr). Fit checks are memoised per state.
+    def __init__(self, bits: BitBoard, positions: list[tuple]):
+        self.bits = bits
+        pivot = positions[0]
+        offsets = [(row - pivot[0], col - pivot[1]) for row, col in positions]
+        self.start = (0, pivot[0], pivot[1])
+        self.turnable = len(positions) > 1
+        self.offsets = []
+        self.masks = [] # Per turn: (lowest column offset, highest column offset, [(row offset, mask)])
+        for turns in range(4):
+            self.offsets.append(offsets)
+            low = min(dc for dr, dc in offsets)
+            rows = {}
+            for dr, dc in offsets:
+                rows[dr] = rows.get(dr, 0) | 1 << (dc - low)
+            self.masks.append((low, max(dc for dr, dc in offsets), list(rows.items())))
+            offsets = [(-dc, dr) for dr, dc in offsets]
+        self._fits: dict = {}
+
+    def positions(self, state: tuple) -> list[tuple]:
+        turns, row, col = state
+        return [(row + dr, col + dc) for dr, dc in self.offsets[turns]]
+
+    def fits(self, state: tuple) -> bool:
+        fits = self._fits.get(state)
+        if fits is None:
+            turns, row, col = state
+            low, high, rows = self.masks[turns]
+            bits = self.bits
+            fits = 0 <= col + low and col + high < bits.width
+            for dr, mask in rows:
+                if not fits:
+                    break
+                fits = 0 <= row + dr < bits.height and not bits.rows[row + dr] & mask << (col + low)
+            self._fits[state] = fits
+        return fits
+
+    def command(self, state: tuple, command: str) -> tuple:
+        # Where one command leaves the shape, as TileShape moves it; blocked commands leave it in place
+        turns, row, col = state
+        if command == "drop":
+            while self.fits((turns, row + 1, col)):
+                row += 1
+            return (turns, row, col)
+        if command == "left":
+            moved = (turns, row, col - 1)
+        elif command == "right":
+            moved = (turns, row, col + 1)
+        elif command == "down":
+            moved = (turns, row + 1, col)
+        elif command == "rotate" and self.turnable:
+            moved = ((turns + 1) % 4, row, col)
+        else:
+            return state
+        return moved if self.fits(moved) else state
+
+    def advance(self, state: tuple, command: str) -> tuple[tuple, bool]:
+        # One Tetris.step: the command, then one row of gravity. Returns the new state and whether
+        # the shape has landed there, which it does once it cannot fall any further.
+        turns, row, col = self.command(state, command)
+        if not self.fits((turns, row + 1, col)):
+            return (turns, row, col), True
+        return (turns, row + 1, col), not self.fits((turns, row + 2, col))
+
+
+class TetrisAI:
+    def __init__(self, evaluator: Callable[[BitBoard, int], float] = defaultEvaluator,
+                 lookahead: bool = True, cacheSize: int = 100000):
+        self.evaluator = evaluator
+        self.lookahead = lookahead
+        self.cacheSize = cacheSize
+        self._cache: dict = {}
+        self._plan: Optional[tuple] = None # (stack rows, positions, next shape id) the rest of the path starts from
+        self.placementsEvaluated = 0
+
+    def placements(self, bits: BitBoard, positions: list[tuple]):
+        # Every resting place reachable from here under Tetris.step, breadth first over the shape's
+        # states so each comes with a shortest command path. Yields (path, resting positions, piece masks).
+        mover = _Mover(bits, positions)
+        parents = {mover.start: None}
+        frontier = [mover.start]
+        rested = set()
+        seen = set()
+        while frontier:
+            following = []
+            for state in frontier:
+                for command in Tetris.MOVES:
+                    reached, landed = mover.advance(state, command)
+                    if not landed:
+                        if reached not in parents:
+                            parents[reached] = (state, command)
+                            following.append(reached)
+                        continue
+                    if reached in rested:
+                        continue
+                    rested.add(reached)
+                    resting = mover.positions(reached)
+                    piece = bits.pieceMasks(resting)
+                    key = tuple(sorted(piece.items()))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    path = [command]
+                    step = parents[state]
+                    while step is not None:
+                        path.append(step[1])
+                        step = parents[step[0]]
+                    path.reverse()
+                    yield path, resting, piece
+            frontier = following
+
+    def _result(self, bits: BitBoard, piece: dict) -> tuple[BitBoard, int]:
+        after = bits.copy()
+        after.place(piece)
+        return after, after.clearFullRows()
+
+    def _bestScore(self, bits: BitBoard, positions: list[tuple], lines: int = 0) -> float:
+        # Best evaluator score over every placement of this piece, counting `lines` already cleared
+        # on the way to bits; cached by board, piece and those lines
+        key = (tuple(bits.rows), tuple(positions), lines)
+        score = self._cache.get(key)
+        if score is not None:
+            return score
+        score = float("-inf")
+        for path, landed, piece in self.placements(bits, positions):
+            if 0 in piece:
+                continue # Landing in the top row ends the game
+            after, cleared = self._result(bits, piece)
+            self.placementsEvaluated += 1
+            score = max(score, self.evaluator(after, lines + cleared))
+        if len(self._cache) >= self.cacheSize:
+            self._cache.clear()
+        self._cache[key] = score
+        return score
+
+    def choosePlacement(self, bits: BitBoard, positions: list[tuple],
+                        nextPositions: Optional[list[tuple]] = None) -> Optional[Placement]:
+        # bits is the settled stack only; positions are the falling shape's tiles in tile order
+        best = None
+        for path, landed, piece in self.placements(bits, positions):
+            after, lines = self._result(bits, piece)
+            self.placementsEvaluated += 1
+            score = self.evaluator(after, lines)
+            if 0 in piece:
+                score = float("-inf") # Landing in the top row ends the game
+            elif self.lookahead and nextPositions is not None:
+                spawn = after.pieceMasks(nextPositions)
+                if after.fits(spawn):
+                    score = self._bestScore(after, nextPositions, lines)
+                else:
+                    score = float("-inf")
+            if best is None or score > best.score:
+                best = Placement(path, landed, score)
+        return best
+
+    def chooseMove(self, game: Tetris.Tetris) -> str:
+        # Next command on the path to the best placement. The path is planned once per shape and
+        # followed while each step leaves the shape where the plan expects it.
+        shape = game.current_tile_shape
+        if not shape.tiles:
+            return "pass"
+        positions = tuple(tile.position for tile in shape.tiles)
+        bits = game.player.board.getBitBoard() # The falling shape is not on the board
+        key = (tuple(bits.rows), positions, game.next_shape_id)
+        if self._plan is None or self._plan[0] != key:
+            nextPositions = list(Tetris.shapes[game.next_shape_id]) if game.next_shape_id is not None else None
+            placement = self.choosePlacement(bits, list(positions), nextPositions)
+            path = placement.path if placement is not None else ["drop"]
+        else:
+            path = self._plan[1]
+        command = path[0]
+        mover = _Mover(bits, list(positions))
+        reached, landed = mover.advance(mover.start, command)
+        self._plan = None if landed else ((key[0], tuple(mover.positions(reached)), key[2]), path[1:])
+        return command
+
+
+_defaultAI: Optional[TetrisAI] = None
+
+def searchPolicy(game: Tetris.Tetris, rng) -> str:
+    # Batch-runner policy backed by one TetrisAI per process
+    global _defaultAI
+    if _defaultAI is None:
+        _defaultAI = TetrisAI()
+    return _defaultAI.chooseMove(game)
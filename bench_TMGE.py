@@ -0,0 +1,171 @@
+import TMGE
+import Bejeweled
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+# Standalone benchmark runner for the core board and game operations.
+#   python bench_TMGE.py --out bench.json                  measure and write JSON
+#   python bench_TMGE.py --save-baseline baseline.json     measure and store a baseline
+#   python bench_TMGE.py --baseline baseline.json          measure and exit 1 on regressions
+
+DEFAULT_SIZES = [8, 32, 128, 1000]
+
+
+def measure(setup: Callable[[], Any], action: Callable[[Any], Any], budget: float, minRuns: int = 3, maxRuns: int = 1000) -> dict:
+    # Times action(setup()) repeatedly, excluding setup, until the time budget is spent
+    timings = []
+    spent = 0.0
+    while len(timings) < minRuns or (spent < budget and len(timings) < maxRuns):
+        state = setup()
+        start = time.perf_counter()
+        action(state)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        spent += elapsed
+    return {"min_s": min(timings), "median_s": statistics.median(timings), "runs": len(timings)}
+
+
+def _randomBoard(size: int, seed: int) -> TMGE.Board:
+    return TMGE.Board(size, size, Bejeweled.JEWELS, random.Random(seed))
+
+def _holedBoard(board: TMGE.Board, seed: int) -> TMGE.Board:
+    # Copy with about a third of the cells cleared
+    board = board.copy()
+    rng = random.Random(seed)
+    w = board.width
+    board.clearTileSet({board._viewTile(k // w, k % w) for k in range(board.height * w) if rng.random() < 0.33})
+    return board
+
+def _rowHoledBoard(board: TMGE.Board) -> TMGE.Board:
+    # Copy where every other row has one empty cell, so half the rows are full
+    board = board.copy()
+    board.clearTileSet({board._viewTile(row, row % board.width) for row in range(0, board.height, 2)})
+    return board
+
+def _displayedBoard(board: TMGE.Board) -> TMGE.Board:
+    # Copy whose display is cached except for its first row
+    board = board.copy()
+    board.getBoardDisplay()
+    board.setTileAt(0, 0, None)
+    return board
+
+def _uncachedBoard(board: TMGE.Board) -> TMGE.Board:
+    # The board itself, after emptying the match cache so matches are really searched for
+    TMGE._MATCH_CACHE.clear()
+    return board
+
+def _shape(size: int) -> TMGE.TileShape:
+    board = TMGE.Board(size, size, ['X'], random.Random(0))
+    board.clearBoard()
+    shape = TMGE.TileShape(True, board)
+    middle = size // 2
+    tiles = [TMGE.Tile(position, board.colors, board) for position in
+             [(middle, middle), (middle, middle - 1), (middle, middle + 1), (middle - 1, middle)]]
+    for tile in tiles:
+        board.board[tile.position[0]][tile.position[1]] = tile
+    shape.createTileShape(tiles)
+    return shape
+
+def _game(size: int, seed: int) -> Bejeweled.Bejeweled:
+    game = Bejeweled.Bejeweled.createHeadless(1, random.Random(seed))
+    game._board = _randomBoard(size, seed)
+    return game
+
+def _uncachedGame(size: int, seed: int) -> Bejeweled.Bejeweled:
+    # Game whose board state has not been seen by the swap-existence cache
+    Bejeweled._FUTURE_MATCHES_CACHE.clear()
+    return _game(size, seed)
+
+def _refillGame(size: int, seed: int) -> Bejeweled.Bejeweled:
+    game = _game(size, seed)
+    game._makeInitialBoard()
+    game._board.clearTileSet({game._board._viewTile(row, col) for row in range(min(3, size)) for col in range(size)})
+    return game
+
+
+def cases(size: int) -> dict:
+    # name -> (setup, action); setup runs before every timed call and is not itself timed
+    base = _randomBoard(size, size)
+    return {
+        "Board.__init__": (lambda: None, lambda _: _randomBoard(size, 1)),
+        "Board.getMatchingSets": (lambda: _uncachedBoard(base), lambda board: board.getMatchingSets()),
+        "Board.applyGravity": (lambda: _holedBoard(base, 2), lambda board: board.applyGravity()),
+        "Board.fillMissingTiles": (lambda: _holedBoard(base, 3), lambda board: board.fillMissingTiles()),
+        "Board.clearHorizontal": (lambda: _rowHoledBoard(base), lambda board: board.clearHorizontal()),
+        "Board.getBoardDisplay": (lambda: base.copy(), lambda board: board.getBoardDisplay()),
+        "Board.getBoardDisplay.oneDirtyRow": (lambda: _displayedBoard(base), lambda board: board.getBoardDisplay()),
+        "TileShape.moveTileShape": (lambda: _shape(size), lambda shape: shape.moveTileShape()),
+        "TileShape.rotateTileShape": (lambda: _shape(size), lambda shape: shape.rotateTileShape()),
+        "TileShape.shiftTileShape": (lambda: _shape(size), lambda shape: shape.shiftTileShape(TMGE.Direction.LEFT)),
+        "Bejeweled._makeInitialBoard": (lambda: _game(size, 4), lambda game: game._makeInitialBoard()),
+        "Bejeweled._refillBoard": (lambda: _refillGame(size, 5), lambda game: game._refillBoard()),
+        "Bejeweled._futureMatchesExist": (lambda: _uncachedGame(size, 6), lambda game: game._futureMatchesExist(game._board)),
+    }
+
+
+def runBenchmarks(sizes: list, budget: float, only: str = None) -> dict:
+    results = {}
+    for size in sizes:
+        for name, (setup, action) in cases(size).items():
+            if only and only not in name:
+                continue
+            key = f"{name}[{size}x{size}]"
+            results[key] = measure(setup, action, budget)
+            print(f"{key:45} {results[key]['median_s'] * 1e6:14.1f} us  ({results[key]['runs']} runs)", file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # Cases whose median is more than (1 + tolerance) times the baseline median
+    regressions = []
+    for key, old in baseline.items():
+        new = results.get(key)
+        if new is not None and new["median_s"] > old["median_s"] * (1 + tolerance):
+            regressions.append(f"{key}: {old['median_s'] * 1e6:.1f} us -> {new['median_s'] * 1e6:.1f} us")
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TMGE core operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds of timed runs per case")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--out", default="-", help="JSON output file, or - for stdout")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 means 50%%")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(args.sizes, args.budget, args.only)
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(), "time": time.time()},
+              "results": results}
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as out:
+            out.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:", file=sys.stderr)
+            for line in regressions:
+                print("  " + line, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from Bejeweled import *
+from BejeweledSolver import BejeweledSolver
 import unittest
 
 class Test_Bejeweled(unittest.TestCase):
@@ -7,7 +8,55 @@ class Test_Bejeweled(unittest.TestCase):
             game = Bejeweled([PlayerProfile(1, [], 0, 0)])
             assert(not game._matchesExist(game._board))
             assert(game._futureMatchesExist(game._board))
-            
+
+    def test_refill_adds_no_matches_and_keeps_a_move(self):
+        for i in range(0, 200):
+            game = Bejeweled([PlayerProfile(1, [], 0, 0)])
+            game._board.clearTileSet({game._board.board[row][col] for row in range(i % 4) for col in range(8)})
+            game._refillBoard()
+            assert(not game._matchesExist(game._board))
+            assert(game._futureMatchesExist(game._board))
+
+    def test_headless_game_runs_to_completion(self):
+        game = Bejeweled([PlayerProfile(1, [], 0, 0)], headless=True)
+        while not game.isFinished():
+            result = game.step(game.getLegalMoves()[0])
+            assert(result.valid)
+            assert(any(event["type"] == "match" for event in result.events))
+        assert(result.reason == "turns")
+        assert(result.scores[1] >= 15)
+        assert(not game.step(((0, 0), (0, 1))).valid)
+
+    def test_score_events_credit_each_player_by_id(self):
+        game = Bejeweled([PlayerProfile(3, [], 0, 0), PlayerProfile(8, [], 0, 0)], headless=True,
+                         rng=random.Random(2), recordScores=True)
+        for player in [3, 8, 3]:
+            result = game.step(game.getLegalMoves()[0])
+            scored = [event for event in result.events if event["type"] == "score"]
+            cleared = sum(event["cleared"] for event in result.events if event["type"] == "match")
+            assert(all(event["player"] == player and event["length"] >= 3 for event in scored))
+            assert(sum(event["points"] for event in scored) == cleared)
+        assert(set(result.scores) == {3, 8} and result.scores[8] > 0)
+        crossing = scoreRuns([[(0, 0), (0, 1), (0, 2)], [(0, 2), (1, 2), (2, 2), (3, 2)]], 3, 1, 2)
+        assert([(event.length, event.cells, event.points) for event in crossing] == [(3, 3, 6), (4, 3, 6)])
+
+    def test_games_with_the_same_seed_match_when_interleaved(self):
+        first = Bejeweled.createHeadless(1, random.Random(7))
+        second = Bejeweled.createHeadless(1, random.Random(7))
+        random.random()
+        assert(first._board.getCodeGrid() == second._board.getCodeGrid())
+        while not first.isFinished():
+            move = first.getLegalMoves()[-1]
+            assert(first.step(move).state == second.step(move).state)
+
+    def test_solver_ranks_every_legal_swap_without_touching_the_board(self):
+        game = Bejeweled.createHeadless(1, random.Random(11))
+        before = game._board.getCodeGrid()
+        ranked = BejeweledSolver(samples=3).rank(game._board)
+        assert(sorted(move.swap for move in ranked) == game.getLegalMoves())
+        assert(all(a.expectedScore >= b.expectedScore for a, b in zip(ranked, ranked[1:])))
+        assert(all(min(move.scores) >= 3 for move in ranked))
+        assert(game._board.getCodeGrid() == before)
 
 
 if __name__ == '__main__':
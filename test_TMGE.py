@@ -0,0 +1,159 @@
+from TMGE import *
+from TMGE_render import TerminalRenderer, CLEAR_SCREEN, moveTo
+import io
+import random
+import unittest
+
+class Test_Board(unittest.TestCase):
+    def test_tile_views_read_and_write_the_board(self):
+        board = Board(3, 4, ['A', 'B'])
+        board.setTileAt(0, 0, 'A')
+        board.setTileAt(0, 1, 'B')
+        first = board.getTileAt(0, 0)
+        board.swapPositions(first, board.board[0][1])
+        assert(first.contents.content == 'B')
+        assert(board.getContentAt(0, 1) == 'A')
+        first.contents.clearContent()
+        assert(not board.isTileAt(0, 0))
+        assert(board.getTileAt(0, 0) is None)
+        assert(board.board[0][1] in [board.getTileAt(0, 1)])
+
+    def test_matching_runs_are_grouped_whole(self):
+        board = Board(4, 5, ['A', 'B', 'C'])
+        board.clearBoard()
+        for col in range(5):
+            board.setTileAt(0, col, 'A')
+        for row in range(1, 4):
+            board.setTileAt(row, 2, 'B')
+        runs = sorted(board.getMatchingRuns())
+        assert(runs == [[(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)], [(1, 2), (2, 2), (3, 2)]])
+        assert(sum(board.getMatchMask()) == 8)
+        assert(board.clearMatches())
+        assert(not board.hasMatches())
+
+    def test_swap_check_leaves_board_unchanged(self):
+        board = Board(3, 4, ['A', 'B', 'C'])
+        for row, line in enumerate(["AABC", "CCAB", "BCAB"]):
+            for col, content in enumerate(line):
+                board.setTileAt(row, col, content)
+        before = board.getBoardDisplay()
+        assert(board.matchesCreatedBySwap((0, 2), (1, 2)) == {(0, 0), (0, 1), (0, 2)})
+        assert(board.matchesCreatedBySwap((0, 0), (0, 1)) == set())
+        assert(board.getBoardDisplay() == before)
+
+    def test_valid_swaps_follow_board_changes(self):
+        board = Board(2, 5, ['A', 'B', 'C'])
+        for row, line in enumerate(["ABCAB", "CABCA"]):
+            for col, content in enumerate(line):
+                board.setTileAt(row, col, content)
+        assert(not board.hasValidSwap())
+        board.setTileAt(1, 2, 'A')
+        assert(board.getValidSwaps() == [((0, 0), (1, 0)), ((0, 3), (1, 3)), ((1, 3), (1, 4))])
+        board.clearBoard()
+        assert(board.getValidSwaps() == [])
+
+    def test_copy_is_independent_of_original(self):
+        board = Board(4, 4, ['A', 'B', 'C'])
+        before = board.getBoardDisplay()
+        copied = board.copy()
+        copied.clearTileSet({copied.board[0][0], copied.board[3][3]})
+        copied.applyGravity()
+        copied.clearBoard()
+        assert(board.getBoardDisplay() == before)
+
+    def test_gravity_compacts_columns_and_reports_moves(self):
+        board = Board(4, 2, ['A', 'B'])
+        for row, line in enumerate(["AB", "B.", "..", "A."]):
+            for col, content in enumerate(line):
+                board.setTileAt(row, col, None if content == "." else content)
+        moved = board.applyGravity()
+        assert([board.getContentAt(row, 0) for row in range(4)] == [None, 'A', 'B', 'A'])
+        assert(board.getContentAt(3, 1) == 'B')
+        assert(sorted(moved) == [((0, 0), (1, 0)), ((0, 1), (3, 1)), ((1, 0), (2, 0))])
+
+    def test_full_rows_are_dropped_together(self):
+        board = Board(4, 3, ['X'])
+        board.clearTileSet({board.board[0][0], board.board[0][1], board.board[0][2], board.board[2][1]})
+        board.setTileAt(0, 1, 'X')
+        assert([board.getRowFill(row) for row in range(4)] == [1, 3, 2, 3])
+        assert(board.clearFullRows([2]) == 0)
+        assert(board.clearFullRows() == 2)
+        assert([board.getRowFill(row) for row in range(4)] == [0, 0, 1, 2])
+        assert(board.getContentAt(2, 1) == 'X' and not board.isTileAt(3, 1))
+
+    def test_shape_moves_are_checked_against_row_masks(self):
+        board = Board(4, 4, ['X'])
+        board.clearBoard()
+        board.setTileAt(3, 1, 'X')
+        shape = TileShape(True, board)
+        tiles = [Tile(position, board.colors, board) for position in [(1, 0), (1, 1)]]
+        for tile in tiles:
+            board.board[tile.position[0]][tile.position[1]] = tile
+        shape.createTileShape(tiles)
+        assert(board.getBitBoard().rows == [0, 0, 0, 0b10]) # The falling shape is kept off the board
+        assert(not shape.shiftTileShape(Direction.LEFT))
+        assert(shape.moveTileShape())
+        assert(shape.isLanded())
+        assert(shape.shiftTileShape(Direction.RIGHT))
+        assert(board.getBitBoard().rows == [0, 0, 0, 0b10])
+        assert(shape.drawCodes(board.getCodeGrid()) == [[0, 0, 0, 0], [0, 0, 0, 0], [0, 1, 1, 0], [0, 1, 0, 0]])
+        shape.settle()
+        assert(board.getBitBoard().rows == [0, 0, 0b110, 0b10])
+        assert(not shape.moveTileShape())
+
+    def test_display_follows_writes_and_marks(self):
+        board = Board(2, 3, ['A'])
+        assert(board.getBoardDisplay() == "'A' 'A' 'A'\n'A' 'A' 'A'")
+        board.setTileAt(1, 0, None)
+        board.setTileAt(0, 2, 'B')
+        assert(board.getBoardDisplay() == "'A' 'A' 'B'\n    'A' 'A'")
+        board.markPositions([(0, 0), (0, 1), (0, 2)])
+        assert(board.getMatchingBoardDisplay() == ". . .\n. . .")
+        assert(board.getDisplayGlyphs()[0] == ["'A'", "'A'", "'B'"])
+
+    def test_hash_tracks_board_contents(self):
+        board = Board(3, 3, ['A', 'B', 'C'])
+        before = board.getHash()
+        board.swapPositions(board.board[0][0], board.board[2][1])
+        board.swapPositions(board.board[0][0], board.board[2][1])
+        assert(board.getHash() == before)
+        board.setTileAt(1, 1, None)
+        assert(board.getHash() != before)
+        same = Board.fromCodeGrid(board.getCodeGrid(), ['A', 'B', 'C'])
+        assert(same.getStateKey() == board.getStateKey())
+
+    def test_fromCodeGrid_draws_nothing_from_rng(self):
+        rng = random.Random(5)
+        state = rng.getstate()
+        board = Board.fromCodeGrid([[1, 0], [2, 1]], ['A', 'B'], rng)
+        assert(rng.getstate() == state)
+        assert(board.getCodeGrid() == [[1, 0], [2, 1]])
+
+
+class Test_ShellGame(unittest.TestCase):
+    def test_headless_api_must_be_overridden(self):
+        class PlayOnly(ShellGame):
+            def playGame(self):
+                return None
+        with self.assertRaises(TypeError):
+            PlayOnly()
+
+
+class Test_TerminalRenderer(unittest.TestCase):
+    def test_only_changed_cells_and_lines_are_sent(self):
+        out = io.StringIO()
+        renderer = TerminalRenderer(out)
+        renderer.render([[" A ", " B ", " C "], [" D ", " E ", " F "]], ["Score 0"])
+        assert(out.getvalue().startswith(CLEAR_SCREEN))
+        out.truncate(0)
+        out.seek(0)
+        renderer.render([[" A ", " x ", " y "], [" D ", " E ", " F "]], ["Score 0"])
+        assert(out.getvalue() == moveTo(1, 5) + " x " + " " + " y " + moveTo(4, 1) + "\033[J")
+        out.truncate(0)
+        out.seek(0)
+        renderer.render([[" A ", " x ", " y "], [" D ", " E ", " F "]], ["Score 3"])
+        assert(" A " not in out.getvalue() and "Score 3" in out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
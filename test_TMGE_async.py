@@ -0,0 +1,37 @@
+from TMGE_async import *
+import io
+import random
+import unittest
+
+class Test_Sessions(unittest.TestCase):
+    def test_sessions_share_one_event_loop(self):
+        async def playAll():
+            tetris = [TetrisSession(Tetris.Tetris(headless=True, rng=random.Random(seed)), tickInterval=0.001, out=io.StringIO())
+                      for seed in range(3)]
+            bejeweled = BejeweledSession(Bejeweled.Bejeweled.createHeadless(1, random.Random(4)), stageInterval=0)
+            for session in tetris:
+                session.commands.put_nowait("rotate")
+            await bejeweled.commands.put("h")
+            await bejeweled.commands.put("0 0 q")
+
+            async def swapEveryTurn():
+                while not bejeweled.game.isFinished():
+                    (x, y), (x2, y2) = bejeweled.game.getLegalMoves()[0]
+                    direction = "s" if x2 > x else "d"
+                    await bejeweled.commands.put(f"{x + 1} {y + 1} {direction}")
+                    turn = bejeweled.game._currentTurnNumber
+                    while bejeweled.game._currentTurnNumber == turn and not bejeweled.game.isFinished():
+                        await asyncio.sleep(0)
+
+            await asyncio.gather(runSessions(tetris + [bejeweled]), swapEveryTurn())
+            return tetris, bejeweled
+
+        tetris, bejeweled = asyncio.run(playAll())
+        assert(all(session.game.finish_reason == "topout" for session in tetris))
+        assert(all("Game Over!" in session.renderer._out.getvalue() for session in tetris))
+        assert(bejeweled.game._finishReason == "turns")
+        assert(bejeweled.message.startswith("GAME OVER!"))
+
+
+if __name__ == '__main__':
+    unittest.main()
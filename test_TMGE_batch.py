@@ -0,0 +1,41 @@
+from TMGE_batch import *
+import csv
+import io
+import json
+import unittest
+
+class Test_Batch(unittest.TestCase):
+    def test_workers_do_not_change_results(self):
+        for gameClass in [Bejeweled.Bejeweled, Tetris.Tetris]:
+            serial = list(runBatch(gameClass, randomPolicy, range(6), workers=1, maxSteps=40))
+            parallel = list(runBatch(gameClass, randomPolicy, range(6), workers=2, maxSteps=40))
+            assert([result["seed"] for result in serial] == list(range(6)))
+            assert(serial == parallel)
+
+    def test_jsonl_rows_hold_every_field(self):
+        results = list(runBatch(Bejeweled.Bejeweled, greedyPolicy, range(3)))
+        out = io.StringIO()
+        assert(writeResults(results, out, "jsonl") == 3)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert(len(rows) == 3)
+        for row, result in zip(rows, results):
+            assert(list(row) == CSV_FIELDS)
+            assert(row["seed"] == result["seed"] and row["turns"] == result["turns"])
+            assert(row["max_cascade_depth"] == max(row["cascade_depths"], default=0))
+
+    def test_csv_rows_hold_every_field(self):
+        results = list(runBatch(Bejeweled.Bejeweled, randomPolicy, range(3)))
+        out = io.StringIO()
+        assert(writeResults(results, out, "csv") == 3)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert(len(rows) == 3)
+        for row, result in zip(rows, results):
+            assert(list(row) == CSV_FIELDS)
+            assert(row["game"] == "Bejeweled" and row["policy"] == "randomPolicy")
+            assert(int(row["seed"]) == result["seed"] and int(row["turns"]) == result["turns"])
+            assert(json.loads(row["cascade_depths"]) == result["cascade_depths"])
+            assert(json.loads(row["scores"]) == {str(player): score for player, score in result["scores"].items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+from TMGE_metrics import *
+import Bejeweled
+import Tetris
+import random
+import unittest
+
+class Test_Metrics(unittest.TestCase):
+    def test_histograms_merge_and_estimate_percentiles(self):
+        first = Metrics()
+        second = Metrics()
+        for value in range(1, 101):
+            (first if value % 2 else second).observe("size", value)
+        second.count("games", 3)
+        first.merge(json.loads(json.dumps(second.snapshot())))
+        histogram = first.histogram("size")
+        assert(histogram.count == 100 and histogram.mean() == 50.5)
+        assert(histogram.percentile(0.1) == 10 and 45 <= histogram.percentile(0.5) <= 50)
+        assert(first.counters == {"games": 3})
+
+    def test_games_report_phases_and_counters(self):
+        metrics = Metrics()
+        game = Bejeweled.Bejeweled.createHeadless(1, random.Random(5), metrics)
+        while not game.isFinished():
+            game.step(game.getLegalMoves()[0])
+        tetris = Tetris.Tetris.createHeadless(1, random.Random(5), metrics)
+        tetris.run(["drop"] * 10)
+        assert(metrics.histogram("bejeweled.phase.turn").count == 5)
+        assert(metrics.histogram("bejeweled.cascade_depth").min >= 1)
+        assert(metrics.histogram("bejeweled.match_size").min >= 3)
+        assert(metrics.histogram("bejeweled.refill_attempts").count == metrics.histogram("bejeweled.phase.refill").count)
+        assert(metrics.counters["bejeweled.initial_boards"] == 1 and metrics.counters["tetris.landings"] == 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
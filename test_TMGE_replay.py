@@ -0,0 +1,34 @@
+from TMGE_replay import *
+import unittest
+
+class Test_Replay(unittest.TestCase):
+    def test_recorded_games_replay_to_the_same_state(self):
+        logs = []
+        for gameClass, seed, lateMove in [(Bejeweled.Bejeweled, 1, ((0, 0), (0, 1))), (Tetris.Tetris, 2, "left")]:
+            recorder = GameRecorder(gameClass, seed)
+            rng = random.Random(seed)
+            while not recorder.game.isFinished():
+                recorder.step(rng.choice(recorder.game.getLegalMoves()))
+            assert(not recorder.step(lateMove).valid)
+            logs.append(recorder.finish())
+        data = b"".join(log.toBytes() for log in logs)
+        assert(len(data) == 2 * 28 + sum(len(log.moves) for log in logs))
+        read = list(iterLogs(data))
+        assert([(log.kind, log.seed, log.moves) for log in read] == [(log.kind, log.seed, log.moves) for log in logs])
+        assert(all(replay(log) is None for log in read))
+        read[0].moves = read[0].moves[:-1]
+        assert(replay(read[0]) is not None)
+
+    def test_bejeweled_swaps_encode_in_one_byte(self):
+        assert(decodeMove(0, encodeMove(0, ((3, 4), (2, 4)), 8, 8), 8) == ((2, 4), (3, 4)))
+        assert(decodeMove(0, encodeMove(0, ((7, 6), (7, 7)), 8, 8), 8) == ((7, 6), (7, 7)))
+        assert(decodeMove(0, encodeMove(0, ((2, 1), (2, 2)), 9, 5), 5) == ((2, 1), (2, 2)))
+        assert(encodeMove(0, ((7, 6), (7, 7)), 8, 8) < 256)
+        with self.assertRaises(ValueError):
+            encodeMove(0, ((8, 0), (9, 0)), 8, 8)
+        with self.assertRaises(ValueError):
+            encodeMove(0, ((0, 9), (0, 8)), 8, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
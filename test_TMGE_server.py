@@ -0,0 +1,36 @@
+from TMGE_server import *
+from TMGE_loadtest import runLoad
+import unittest
+
+class Test_GameServer(unittest.TestCase):
+    def test_moves_reply_with_changed_cells_only(self):
+        server = GameServer()
+        sessions = {}
+        state = server.handle(sessions, {"op": "new", "id": "a", "game": "bejeweled", "seed": 3, "withMoves": True})
+        cells = list(state["cells"])
+        reply = server.handle(sessions, {"op": "move", "id": "a", "move": state["moves"][0]})
+        assert(reply["valid"] and 0 < len(reply["changed"]) < 2 * len(cells))
+        for index, code in zip(reply["changed"][::2], reply["changed"][1::2]):
+            cells[index] = code
+        assert(cells == [code for row in sessions["a"].game.getState() for code in row])
+        with self.assertRaises(KeyError):
+            server.handle(sessions, {"op": "move", "id": "b", "move": "left"})
+
+    def test_bad_player_counts_are_rejected(self):
+        server = GameServer()
+        sessions = {}
+        for players in [0, -1, MAX_PLAYERS + 1, "2", 1.5, True]:
+            with self.assertRaises(ValueError):
+                server.handle(sessions, {"op": "new", "id": "a", "game": "bejeweled", "players": players})
+        assert(sessions == {})
+        state = server.handle(sessions, {"op": "new", "id": "a", "game": "bejeweled", "players": 2})
+        assert(len(state["cells"]) == 64)
+
+    def test_load_client_plays_sessions_over_tcp(self):
+        summary = asyncio.run(runLoad("bejeweled", connections=4, sessions=2, maxMoves=30, local=True))
+        assert(summary["moves"] == 4 * 2 * 5) # Every legal swap matches, so each game lasts its 5 turns
+        assert(summary["latency_max_ms"] >= summary["latency_median_ms"] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+from TMGE_store import *
+from TMGE_start import TMGEshell
+import unittest
+
+class Test_PlayerStore(unittest.TestCase):
+    def test_shell_registers_each_name_once_and_keeps_scores_by_id(self):
+        shell = TMGEshell(PlayerStore(":memory:"))
+        assert(shell.register_player("Guest"))
+        assert(shell.register_player("Ada"))
+        assert(not shell.register_player("Ada"))
+        ada = shell._store.getByName("Ada")
+        guest = shell._store.getByName("Guest")
+        shell.storeResults({ada.id: 12, guest.id: 3})
+        shell.storeResults({ada.id: 5})
+        assert(shell._store.getById(ada.id).totalScore == 17)
+        assert([player.name for player in shell._store.players()] == ["Guest", "Ada"])
+
+    def test_leaderboard_returns_the_top_totals(self):
+        store = PlayerStore(":memory:")
+        for number in range(50):
+            store.register("player" + str(number))
+        store.addScores({store.getByName("player" + str(number)).id: number % 7 for number in range(50)})
+        top = store.leaderboard(3)
+        assert([player.totalScore for player in top] == [6, 6, 6])
+        assert(len(store) == 50 and store.getByName("nobody") is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
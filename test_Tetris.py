@@ -0,0 +1,49 @@
+from Tetris import *
+from TetrisAI import TetrisAI, countHoles, columnHeights
+import unittest
+
+class Test_Tetris(unittest.TestCase):
+    def test_headless_game_tops_out(self):
+        game = Tetris(headless=True)
+        results = game.run(["pass"] * 1000)
+        assert(game.isFinished())
+        assert(results[-1].reason == "topout")
+        assert(len(results[-1].state) == 20)
+
+    def test_hard_drop_lands_on_the_ghost_positions(self):
+        game = Tetris(headless=True, rng=random.Random(3))
+        game.spawn_shape()
+        ghost = sorted(game.current_tile_shape.getGhostPositions())
+        assert(max(row for row, col in ghost) == 19)
+        result = game.step("drop")
+        assert({"type": "land"} in result.events)
+        assert(all(result.state[row][col] for row, col in ghost))
+
+    def test_search_fills_the_gap_in_a_row(self):
+        bits = BitBoard(4, 4, [0, 0, 0b0000, 0b1001])
+        ai = TetrisAI(lookahead=False)
+        placement = ai.choosePlacement(bits, [(0, 1), (0, 2)])
+        assert(sorted(placement.positions) == [(3, 1), (3, 2)])
+        assert(columnHeights(bits) == [1, 0, 0, 1])
+        assert(countHoles(BitBoard(3, 2, [0b01, 0, 0b10])) == 2)
+
+    def test_lookahead_scores_both_pieces_with_the_evaluator(self):
+        # Each domino clears one row, and the evaluator alone decides what both clears are worth
+        bits = BitBoard(4, 4, [0, 0, 0b1001, 0b1001])
+        ai = TetrisAI(evaluator=lambda after, lines: 10 * lines, lookahead=True)
+        placement = ai.choosePlacement(bits, [(0, 1), (0, 2)], [(0, 1), (0, 2)])
+        assert(sorted(placement.positions) == [(3, 1), (3, 2)])
+        assert(placement.score == 20)
+
+    def test_search_policy_clears_lines_under_gravity(self):
+        # Every step ends with a gravity tick, so the search has to plan paths the shape can really take
+        game = Tetris(headless=True, rng=random.Random(0))
+        ai = TetrisAI(lookahead=False)
+        for turn in range(500):
+            game.step(ai.chooseMove(game))
+        assert(not game.isFinished())
+        assert(game.lines_cleared >= 30)
+
+
+if __name__ == '__main__':
+    unittest.main()